@@ -4,3 +4,4 @@ from .genre_endpoints import genre_router
 from .basket_endpoints import basket_router
 from .order_endpoints import order_router
 from .wishlist_endpoints import wishlist_router
+from .job_endpoints import job_router
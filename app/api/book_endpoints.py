@@ -1,10 +1,14 @@
-from typing import List
-from fastapi import APIRouter, UploadFile, File
+import datetime
+from typing import Dict, List, Literal, Optional
+from fastapi import APIRouter, UploadFile, File, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.params import Depends, Query, Path
+from starlette.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app import db as app_db
-from app import services, schemas
+from app import services, schemas, config
 from app.exceptions import errors
+from .http_cache import is_not_modified, not_modified_response, validator_headers
 
 book_router = APIRouter()
 
@@ -22,13 +26,147 @@ async def create_book(
     return services.create_book(book, current_session)
 
 
+@book_router.post(
+    "/admin/books/bulk", tags=["Books Admin"], response_model=schemas.BulkImportReport
+)
+async def import_books(
+    file: UploadFile = File(
+        ..., description="CSV or NDJSON file with one book per row."
+    ),
+    file_format: Optional[Literal["csv", "ndjson"]] = Query(
+        None, alias="format", description="Defaults to the file extension."
+    ),
+    batch_size: int = Query(
+        config.BULK_IMPORT_BATCH_SIZE, ge=1, le=config.BULK_IMPORT_MAX_BATCH_SIZE
+    ),
+    current_session: Session = Depends(app_db.get_db),
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    file_format = file_format or services.detect_import_format(
+        file.filename, file.content_type
+    )
+    # Parsing and batched inserts are blocking, keep them off the event loop
+    return await run_in_threadpool(
+        services.import_books, file.file, file_format, current_session, batch_size
+    )
+
+
+@book_router.get("/admin/books/export", tags=["Books Admin"])
+async def export_books(
+    file_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    filename = f"books-{datetime.date.today().isoformat()}.{file_format}"
+    return StreamingResponse(
+        services.export_books(file_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @book_router.get("/books", tags=["Books"], response_model=List[schemas.BookModel])
 async def get_books(
+    request: Request,
+    response: Response,
     current_session: Session = Depends(app_db.get_db),
     sorting: schemas.SortingBooks = Depends(),
     pagination: schemas.Pagination = Depends(),
 ):
-    return services.get_books(pagination, sorting, current_session)
+    books = services.get_books(pagination, sorting, current_session)
+    etag, last_modified = services.get_books_freshness(books, pagination, sorting)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    next_cursor = services.get_next_book_cursor(books, pagination, sorting)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return books
+
+
+@book_router.get("/books/facets", tags=["Books"], response_model=schemas.BookFacets)
+async def get_book_facets(
+    current_session: Session = Depends(app_db.get_db),
+    sorting: schemas.SortingBooks = Depends(),
+):
+    return services.get_book_facets(sorting, current_session)
+
+
+@book_router.get(
+    "/books/search", tags=["Books"], response_model=List[schemas.BookModel]
+)
+async def search_books(
+    q: str = Query(..., min_length=1, description="Text to search for."),
+    current_session: Session = Depends(app_db.get_db),
+    pagination: schemas.Pagination = Depends(),
+):
+    return services.search_books(q, pagination, current_session)
+
+
+@book_router.get(
+    "/books/suggest", tags=["Books"], response_model=List[schemas.BookSuggestion]
+)
+async def suggest_books(
+    prefix: str = Query(
+        ..., min_length=1, description="Beginning of a title or author."
+    ),
+    limit: int = Query(
+        config.SUGGESTIONS_DEFAULT_LIMIT,
+        ge=1,
+        le=config.SUGGESTIONS_MAX_LIMIT,
+        description="Maximum number of suggestions.",
+    ),
+):
+    return services.suggest_books(prefix, limit)
+
+
+@book_router.get("/books/covers", tags=["Books"], response_model=Dict[int, str])
+async def get_covers_for_books(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma separated book IDs, e.g. 1,2,3."),
+    w: Optional[int] = Query(None, ge=1, description="Desired width in pixels."),
+    image_format: Optional[Literal["avif", "webp", "jpeg"]] = Query(
+        None, alias="format"
+    ),
+    bundle: Literal["json", "zip"] = Query(
+        "json", description="Cover URLs as JSON, or the thumbnails as one zip."
+    ),
+    current_session: Session = Depends(app_db.get_db),
+):
+    book_ids = services.parse_book_ids(ids)
+    if bundle == "zip":
+        image_format = services.negotiate_variant_format(image_format, None)
+        w = services.nearest_variant_width(w or min(config.IMAGE_VARIANT_WIDTHS))
+        contents = await services.get_cover_bundle(
+            book_ids, w, image_format, current_session
+        )
+        return Response(
+            contents,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="covers.zip"'},
+        )
+
+    cover_urls = services.get_cover_urls(book_ids, w, current_session)
+    headers = validator_headers(services.get_cover_urls_etag(cover_urls))
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    return cover_urls
+
+
+@book_router.get("/admin/books/cache", tags=["Books Admin"])
+async def get_book_cache_stats(
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    return services.get_book_cache_stats()
 
 
 @book_router.delete(
@@ -41,7 +179,7 @@ async def delete_book(
 ):
     if current_user.role != "admin":
         raise errors.OnlyAdminsAllowed()
-    return services.delete_book_by_id(book_id, current_session)
+    return await services.delete_book_by_id(book_id, current_session)
 
 
 @book_router.put(
@@ -60,10 +198,18 @@ async def update_book(
 
 @book_router.get("/books/{book_id}", tags=["Books"], response_model=schemas.BookModel)
 async def get_book_by_id(
+    request: Request,
+    response: Response,
     book_id: int = Path(..., description="ID of the book to get."),
     current_session: Session = Depends(app_db.get_db),
 ):
-    return services.get_book_by_id(book_id, current_session)
+    book = services.get_book_by_id(book_id, current_session)
+    etag, last_modified = services.get_book_freshness(book)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    return book
 
 
 @book_router.post("/admin/books/{book_id}/genres", tags=["Books Admin"])
@@ -100,8 +246,12 @@ async def delete_genre_for_book(
 
 @book_router.post("/admin/books/{book_id}/images", tags=["Books Admin"])
 async def add_image_for_book(
+    response: Response,
     file: UploadFile = File(...),
     book_id: int = Path(..., description="ID of the book"),
+    background: bool = Query(
+        False, description="Queue the processing and return a job ID right away."
+    ),
     current_session: Session = Depends(app_db.get_db),
     current_user: schemas.UserOut = Depends(services.get_current_active_user),
 ):
@@ -109,11 +259,74 @@ async def add_image_for_book(
         raise errors.OnlyAdminsAllowed()
     if not file.content_type.startswith("image/"):
         raise errors.FileMustBeImage()
-    contents = await file.read()
-    return services.add_image_for_book(contents, book_id, current_session)
+    upload = await run_in_threadpool(services.stage_upload, file.file)
+    # A queued upload was moved to the job spool, anything else goes here
+    try:
+        if background:
+            job = await run_in_threadpool(
+                services.enqueue_image_job,
+                book_id,
+                [(file.filename, upload)],
+                current_session,
+            )
+            services.notify_image_job_workers()
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {"status": 202, "job_id": job.job_id}
+        return await services.add_image_for_book(upload, book_id, current_session)
+    finally:
+        services.discard_upload(upload)
 
 
-@book_router.get("/books/{book_id}/images", tags=["Books"])
+@book_router.post(
+    "/admin/books/{book_id}/images/batch",
+    tags=["Books Admin"],
+    response_model=List[schemas.ImageUploadResult],
+)
+async def add_images_for_book(
+    files: List[UploadFile] = File(...),
+    book_id: int = Path(..., description="ID of the book"),
+    background: bool = Query(
+        False, description="Queue the processing and return a job ID right away."
+    ),
+    current_session: Session = Depends(app_db.get_db),
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    if len(files) > config.IMAGE_BATCH_MAX_FILES:
+        raise errors.TooManyImages()
+    uploads = await services.stage_uploads(files)
+    filenames = [file.filename for file in files]
+    try:
+        if background:
+            job, rejected = await run_in_threadpool(
+                services.enqueue_image_batch,
+                uploads,
+                filenames,
+                book_id,
+                current_session,
+            )
+            services.notify_image_job_workers()
+            return JSONResponse(
+                {
+                    "status": 202,
+                    "job_id": job.job_id,
+                    "rejected": [result.model_dump() for result in rejected],
+                },
+                status_code=status.HTTP_202_ACCEPTED,
+            )
+        return await services.add_images_for_book(
+            uploads, filenames, book_id, current_session
+        )
+    finally:
+        services.discard_uploads(uploads)
+
+
+@book_router.get(
+    "/books/{book_id}/images",
+    tags=["Books"],
+    response_model=List[schemas.BookImageModel],
+)
 async def get_images_for_book(
     book_id: int = Path(..., description="ID of the book"),
     current_session: Session = Depends(app_db.get_db),
@@ -130,7 +343,28 @@ async def delete_image_for_book(
 ):
     if current_user.role != "admin":
         raise errors.OnlyAdminsAllowed()
-    return services.delete_image_by_id(book_id, image_id, current_session)
+    return await services.delete_image_by_id(book_id, image_id, current_session)
+
+
+@book_router.put(
+    "/admin/books/{book_id}/images/{image_id}/position",
+    tags=["Books Admin"],
+    response_model=schemas.BookImageModel,
+)
+async def move_image_for_book(
+    book_id: int = Path(..., description="ID of the book"),
+    image_id: int = Path(..., description="ID of the image to move."),
+    before_image_id: Optional[int] = Query(
+        None, description="Image to place it in front of; the end when omitted."
+    ),
+    current_session: Session = Depends(app_db.get_db),
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    return services.move_image_for_book(
+        book_id, image_id, before_image_id, current_session
+    )
 
 
 @book_router.delete("/admin/books/{book_id}/delete_all_images", tags=["Books Admin"])
@@ -142,15 +376,62 @@ async def delete_images_for_book(
 ):
     if current_user.role != "admin":
         raise errors.OnlyAdminsAllowed()
-    return services.delete_all_images_for_book(book_id, current_session, delete_cover)
+    return await services.delete_all_images_for_book(
+        book_id, current_session, delete_cover
+    )
+
+
+@book_router.get("/books/{book_id}/images/{image_id}", tags=["Books"])
+async def get_image_for_book(
+    request: Request,
+    book_id: int = Path(..., description="ID of the book"),
+    image_id: int = Path(..., description="ID of the image"),
+    w: Optional[int] = Query(None, ge=1, description="Desired width in pixels."),
+    image_format: Optional[Literal["avif", "webp", "jpeg"]] = Query(
+        None, alias="format"
+    ),
+    current_session: Session = Depends(app_db.get_db),
+):
+    return await services.get_image_for_book(
+        book_id,
+        image_id,
+        current_session,
+        w,
+        image_format,
+        request.headers.get("accept"),
+    )
 
 
 @book_router.get("/books/{book_id}/cover", tags=["Books"])
 async def get_cover_for_book(
+    request: Request,
     book_id: int = Path(..., description="ID of the book"),
+    w: Optional[int] = Query(None, ge=1, description="Desired width in pixels."),
+    image_format: Optional[Literal["avif", "webp", "jpeg"]] = Query(
+        None, alias="format"
+    ),
+    v: Optional[str] = Query(None, description="Cover version, as in cover_url."),
     current_session: Session = Depends(app_db.get_db),
 ):
-    return services.get_cover_image_for_book(book_id, current_session)
+    cover = await services.get_cover_file(book_id, current_session, v)
+    headers = {
+        "Cache-Control": (
+            f"public, max-age={config.COVER_IMMUTABLE_MAX_AGE}, immutable"
+            if v == cover.version
+            else "no-cache"
+        )
+    }
+    if w is not None or image_format is not None:
+        image_format = services.negotiate_variant_format(
+            image_format, request.headers.get("accept")
+        )
+        w = services.nearest_variant_width(w or max(config.IMAGE_VARIANT_WIDTHS))
+        headers["Vary"] = "Accept"
+    headers["ETag"] = services.get_cover_etag(cover, w, image_format)
+
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+    return await services.get_cover_response(cover, w, image_format, headers)
 
 
 @book_router.get("/admin/books/{book_id}/cover_path", tags=["Books Admin"])
@@ -175,8 +456,11 @@ async def update_cover_for_book(
         raise errors.OnlyAdminsAllowed()
     if not file.content_type.startswith("image/"):
         raise errors.FileMustBeImage()
-    contents = await file.read()
-    return services.update_cover_for_book(contents, book_id, current_session)
+    upload = await run_in_threadpool(services.stage_upload, file.file)
+    try:
+        return await services.update_cover_for_book(upload, book_id, current_session)
+    finally:
+        services.discard_upload(upload)
 
 
 @book_router.delete("/admin/books/{book_id}/cover", tags=["Books Admin"])
@@ -187,7 +471,7 @@ async def delete_cover_for_book(
 ):
     if current_user.role != "admin":
         raise errors.OnlyAdminsAllowed()
-    return services.delete_cover_for_book(book_id, current_session)
+    return await services.delete_cover_for_book(book_id, current_session)
 
 
 @book_router.post(
@@ -0,0 +1,42 @@
+import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+
+def _strip_weak(etag: str):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime.datetime | None = None
+):
+    """Evaluates If-None-Match / If-Modified-Since against the current validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence and uses the weak comparison
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or _strip_weak(etag) in map(_strip_weak, candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        # HTTP dates have a one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: datetime.datetime | None = None):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified_response(headers: dict):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
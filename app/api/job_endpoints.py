@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.params import Depends, Path
+from sqlalchemy.orm import Session
+from app import db as app_db
+from app import services, schemas
+from app.exceptions import errors
+
+job_router = APIRouter()
+
+
+@job_router.get(
+    "/admin/jobs/{job_id}", tags=["Books Admin"], response_model=schemas.ImageJobModel
+)
+async def get_image_job(
+    job_id: int = Path(..., description="ID of the image job"),
+    current_session: Session = Depends(app_db.get_db),
+    current_user: schemas.UserOut = Depends(services.get_current_active_user),
+):
+    if current_user.role != "admin":
+        raise errors.OnlyAdminsAllowed()
+    return services.get_image_job(job_id, current_session)
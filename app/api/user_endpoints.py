@@ -6,14 +6,33 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from starlette.responses import JSONResponse
 
-from .. import schemas, services, config
+from .. import schemas, services, config, rate_limit
 from ..exceptions import errors
 from .. import db as app_db
 
 user_router = APIRouter()
 
+login_rate_limit = rate_limit.RateLimit(
+    "login",
+    config.RATE_LIMIT_LOGIN_PER_IP,
+    config.RATE_LIMIT_LOGIN_PER_USERNAME,
+    field="username",
+)
+signup_rate_limit = rate_limit.RateLimit(
+    "signup",
+    config.RATE_LIMIT_SIGNUP_PER_IP,
+    config.RATE_LIMIT_SIGNUP_PER_EMAIL,
+    field="email",
+)
+password_reset_rate_limit = rate_limit.RateLimit(
+    "password_reset",
+    config.RATE_LIMIT_PASSWORD_RESET_PER_IP,
+    config.RATE_LIMIT_PASSWORD_RESET_PER_EMAIL,
+    field="email",
+)
 
-@user_router.post("/signup", tags=["Users"])
+
+@user_router.post("/signup", tags=["Users"], dependencies=[Depends(signup_rate_limit)])
 async def create_user(
     user: schemas.UserCreate,
     bg_tasks: BackgroundTasks,
@@ -27,7 +46,8 @@ async def create_user(
     if email_exists:
         raise errors.EmailAlreadyExists()
 
-    new_user = services.create_user(user, current_session)
+    hashed_password = await services.hash_password(user.hashed_password)
+    new_user = services.create_user(user, hashed_password, current_session)
 
     bg_tasks.add_task(services.send_verification_email, user.email)
 
@@ -75,8 +95,10 @@ async def get_user(
     current_user: Annotated[
         schemas.UserDecode, Depends(services.get_current_active_user)
     ],
+    session: Session = Depends(app_db.get_db),
 ):
-    return current_user
+    # The authenticated principal is cached and partial, the profile is read fresh
+    return services.get_user(current_user.username, session)
 
 
 @user_router.patch("/users/me", tags=["Users"], response_model=schemas.UserModel)
@@ -93,12 +115,17 @@ async def update_user_profile(
     return services.update_user_profile(user_in_db, user_update, session)
 
 
-@user_router.post("/token", response_model=schemas.Token, tags=["Authentication"])
+@user_router.post(
+    "/token",
+    response_model=schemas.Token,
+    tags=["Authentication"],
+    dependencies=[Depends(login_rate_limit)],
+)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     current_session: Session = Depends(app_db.database.get_db),
 ):
-    user = services.authenticate_user(
+    user = await services.authenticate_user(
         form_data.username, form_data.password, current_session
     )
     if not user:
@@ -110,10 +137,64 @@ async def login_for_access_token(
     access_token = services.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return schemas.Token(access_token=access_token, token_type="bearer")
+    refresh_token = services.create_refresh_token(user.user_id, current_session)
+    return schemas.Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
+
+
+@user_router.post(
+    "/token/refresh", response_model=schemas.Token, tags=["Authentication"]
+)
+async def refresh_access_token(
+    token_request: schemas.RefreshTokenRequest,
+    current_session: Session = Depends(app_db.database.get_db),
+):
+    # No password check, the rotated refresh token stands in for the credentials
+    user, refresh_token = services.rotate_refresh_token(
+        token_request.refresh_token, current_session
+    )
+    access_token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = services.create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    return schemas.Token(
+        access_token=access_token, token_type="bearer", refresh_token=refresh_token
+    )
 
 
-@user_router.post("/password-reset-request", tags=["Users"])
+@user_router.post("/token/revoke", tags=["Authentication"])
+async def revoke_refresh_token(
+    token_request: schemas.RefreshTokenRequest,
+    current_session: Session = Depends(app_db.database.get_db),
+):
+    services.revoke_refresh_token(token_request.refresh_token, current_session)
+    return JSONResponse(
+        content={"message": "Logged out successfully"},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@user_router.delete("/users/me/sessions", tags=["Users"])
+async def revoke_user_sessions(
+    current_user: Annotated[
+        schemas.UserDecode, Depends(services.get_current_active_user)
+    ],
+    current_session: Session = Depends(app_db.get_db),
+):
+    # Access tokens already issued stay valid until they expire
+    revoked = services.revoke_refresh_tokens(current_user.user_id, current_session)
+    return JSONResponse(
+        content={"message": "All sessions were logged out", "revoked": revoked},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+@user_router.post(
+    "/password-reset-request",
+    tags=["Users"],
+    dependencies=[Depends(password_reset_rate_limit)],
+)
 async def password_reset_request(email_data: schemas.PasswordResetRequestModel):
     await services.send_password_reset_email(email_data.email)
     return JSONResponse(
@@ -139,10 +220,9 @@ async def reset_account_password(
         user = services.get_user_by_email(user_email, current_session)
         if not user:
             raise errors.UserNotFound()
+        hashed_password = await services.hash_password(password.new_password)
         services.update_user(
-            user,
-            {"hashed_password": services.get_password_hash(password.new_password)},
-            current_session,
+            user, {"hashed_password": hashed_password}, current_session
         )
         return JSONResponse(
             {"message": "Password reset successfully"}, status_code=status.HTTP_200_OK
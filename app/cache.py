@@ -0,0 +1,155 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from . import config
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for CACHE_BACKEND=redis
+    redis = None
+
+MISSING = object()
+
+
+class MemoryBackend:
+    """Process-local LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Cache shared by every worker through Redis; values are pickled."""
+
+    def __init__(self, namespace: str, url: str, ttl_seconds: float):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package.")
+        self.prefix = f"bookpython:cache:{namespace}:"
+        self.ttl_seconds = ttl_seconds
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key: Hashable):
+        return self.prefix + repr(key)
+
+    def get(self, key: Hashable):
+        try:
+            raw = self._client.get(self._key(key))
+        except redis.RedisError as e:
+            logging.warning("Cache read failed: %s", e)
+            return MISSING
+        return MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key: Hashable, value: Any):
+        try:
+            self._client.set(
+                self._key(key), pickle.dumps(value), ex=int(self.ttl_seconds) or None
+            )
+        except redis.RedisError as e:
+            logging.warning("Cache write failed: %s", e)
+
+    def delete(self, key: Hashable):
+        # The write is already committed, an outage must not fail the request;
+        # the entry then lives until its TTL
+        try:
+            self._client.delete(self._key(key))
+        except redis.RedisError as e:
+            logging.warning("Cache delete failed: %s", e)
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self.prefix + "*", count=500))
+            if keys:
+                self._client.delete(*keys)
+        except redis.RedisError as e:
+            logging.warning("Cache clear failed: %s", e)
+
+
+class Cache:
+    """Read-through cache over a backend, with hit/miss counters.
+
+    Invalidations bump a generation; a load that started before one is
+    returned but not stored, so it cannot put the old row back. The guard
+    is per process: with Redis, a load racing an invalidation made by
+    another worker can still store a stale entry, for at most the TTL.
+    """
+
+    def __init__(self, namespace: str, backend):
+        self.namespace = namespace
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def get_or_set(self, key: Hashable, loader: Callable[[], Any]):
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        generation = self.generation
+        value = loader()
+        # Absent rows are not cached, so a later create is visible immediately
+        if value is not None and generation == self.generation:
+            self.backend.set(key, value)
+        return value
+
+    def delete(self, key: Hashable):
+        self.generation += 1
+        self.backend.delete(key)
+
+    def clear(self):
+        self.generation += 1
+        self.backend.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def create_cache(namespace: str, ttl_seconds: float | None = None):
+    ttl_seconds = config.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    if config.CACHE_BACKEND == "redis":
+        backend = RedisBackend(namespace, config.REDIS_URL, ttl_seconds)
+    else:
+        backend = MemoryBackend(config.CACHE_MAX_ENTRIES, ttl_seconds)
+    return Cache(namespace, backend)
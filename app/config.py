@@ -14,15 +14,128 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # IMAGE PATHS
 IMAGES_BOOKS_PATH = "app/static/images/books/"
 DEFAULT_COVER_PATH = IMAGES_BOOKS_PATH + "cover_not_available.jpg"
+IMAGES_BLOBS_PATH = "app/static/images/blobs/"
+COVER_MAP_TTL_SECONDS = 60  # bounds staleness between workers
+COVER_MAP_MAX_ENTRIES = 10_000
+COVER_IMMUTABLE_MAX_AGE = 31_536_000
+COVER_BATCH_MAX_IDS = 100  # per GET /books/covers request
+IMAGE_POSITION_STEP = 1024  # gap between gallery positions, see move_image_for_book
+
+# IMAGE STORAGE
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")  # "local" or "s3"
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "")
+STORAGE_THREADS = int(os.getenv("STORAGE_THREADS", 8))
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv("S3_REGION")
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "")
+
+# IMAGE VARIANTS
+IMAGE_VARIANT_WIDTHS = [120, 240, 480, 960]
+IMAGE_VARIANT_FORMATS = ["avif", "webp", "jpeg"]  # preferred first
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_PLACEHOLDER_WIDTH = 16  # inlined into book responses, keep it tiny
+IMAGE_PLACEHOLDER_QUALITY = 40
+
+# IMAGE NORMALIZATION
+IMAGE_MAX_DIMENSION = 2400  # longest side of a stored image
+# Lowest JPEG quality whose SSIM against the source still reaches the target
+IMAGE_TARGET_SSIM = 0.985
+IMAGE_MIN_QUALITY = 50
+IMAGE_MAX_QUALITY = 90
+
+# IMAGE PROCESSING POOL
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+IMAGE_QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", 8))  # waiting beyond workers
+IMAGE_RETRY_AFTER_SECONDS = 5
+
+# IMAGE JOBS
+# Raw uploads wait here rather than in /tmp so queued jobs survive a restart
+IMAGE_JOB_SPOOL_PATH = os.getenv("IMAGE_JOB_SPOOL_PATH", "app/spool/images/")
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", 2))
+IMAGE_JOB_POLL_SECONDS = 5  # also picks up jobs queued by other processes
+IMAGE_JOB_LEASE_SECONDS = 300  # a running job without a heartbeat is taken over
+IMAGE_JOB_HEARTBEAT_SECONDS = 30  # well within the lease
+
+# IMAGE UPLOADS
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+IMAGE_UPLOAD_CHUNK_SIZE = 1024 * 1024
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_BATCH_MAX_FILES = 50  # per POST /admin/books/{book_id}/images/batch
 
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
 
+# CATALOG CACHE
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory" or "redis"
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 2048))
+# Upper bound for a role or disabled change to reach other workers (memory backend)
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# BULK IMPORT
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 500))
+BULK_IMPORT_MAX_BATCH_SIZE = 5000
+BULK_IMPORT_GENRES_SEPARATOR = "|"
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", 1000))
+
+# CATALOG SEARCH
+SEARCH_LANGUAGE = "english"
+SUGGESTIONS_DEFAULT_LIMIT = 10
+SUGGESTIONS_MAX_LIMIT = int(os.getenv("SUGGESTIONS_MAX_LIMIT", 25))
+FACET_PRICE_BUCKET_SIZE = 10
+FACET_AUTHORS_LIMIT = 20
+
 # USERS AUTH
-PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The first scheme hashes new passwords, the others are still verified and
+# rehashed on the next login; argon2 needs the 'argon2-cffi' package
+PASSWORD_HASH_SCHEMES = os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt").split(",")
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", 12))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 3))
+PASSWORD_ARGON2_MEMORY_KIB = int(os.getenv("PASSWORD_ARGON2_MEMORY_KIB", 65536))
+# Set to calibrate the cost of the first scheme at startup, 0 keeps the above.
+# Each process measures on its own: pin the printed value in production
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", 0))
+# The cost is a floor: weaker hashes are rehashed on login, stronger ones kept
+PWD_CONTEXT = CryptContext(
+    schemes=PASSWORD_HASH_SCHEMES,
+    deprecated="auto",
+    bcrypt__default_rounds=PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_BCRYPT_ROUNDS,
+    argon2__default_rounds=PASSWORD_ARGON2_TIME_COST,
+    argon2__min_rounds=PASSWORD_ARGON2_TIME_COST,
+    argon2__memory_cost=PASSWORD_ARGON2_MEMORY_KIB,
+)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Refresh tokens slide forward on every use, up to the session's maximum age
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+REFRESH_TOKEN_MAX_AGE_DAYS = int(os.getenv("REFRESH_TOKEN_MAX_AGE_DAYS", 90))
+# bcrypt runs in its own threads so logins never stall the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(
+    os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", 2)
+)
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+# RATE LIMITS
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "redis"
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 100_000))
+# "<requests>/<second|minute|hour|day>": bursts of that size, refilled over the
+# period; an empty value disables the limit
+RATE_LIMIT_LOGIN_PER_IP = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20/minute")
+RATE_LIMIT_LOGIN_PER_USERNAME = os.getenv("RATE_LIMIT_LOGIN_PER_USERNAME", "5/minute")
+RATE_LIMIT_SIGNUP_PER_IP = os.getenv("RATE_LIMIT_SIGNUP_PER_IP", "10/hour")
+RATE_LIMIT_SIGNUP_PER_EMAIL = os.getenv("RATE_LIMIT_SIGNUP_PER_EMAIL", "3/hour")
+RATE_LIMIT_PASSWORD_RESET_PER_IP = os.getenv(
+    "RATE_LIMIT_PASSWORD_RESET_PER_IP", "10/hour"
+)
+RATE_LIMIT_PASSWORD_RESET_PER_EMAIL = os.getenv(
+    "RATE_LIMIT_PASSWORD_RESET_PER_EMAIL", "3/hour"
+)
 
 # EMAIL CONFIGURATION
 MAIL_USERNAME = os.getenv("MAIL_USERNAME")
@@ -3,6 +3,7 @@ import requests
 
 from app import db as app_db, schemas
 from app import config
+from app.services import image_service
 
 BOOKS = [
     (
@@ -69,6 +70,9 @@ def seed_books():
             response = requests.get(book[2])
             with open(f"{book_img_dir}/cover.jpg", "wb") as f:
                 f.write(response.content)
+            new_book.book_cover_placeholder = image_service.render_placeholder(
+                f"{book_img_dir}/cover.jpg"
+            )
             current_session.commit()
             for genre_id in book[1]:
                 stmt = app_db.models.book_genres.insert().values(
@@ -0,0 +1,75 @@
+"""Moves images from the per-title book folders into the content-addressed store.
+
+Run once after the book_images migration:
+
+    python -m app.db.initialization.image_backfill
+"""
+
+import asyncio
+import os
+import re
+import shutil
+
+from app import db as app_db
+from app import config, services
+from app.services import image_service
+
+
+def _store(path: str):
+    with open(path, "rb") as source:
+        upload = image_service.stage_upload(source)
+    try:
+        stored = asyncio.run(image_service.store_image(upload))
+    finally:
+        image_service.discard_upload(upload)
+    return upload, stored
+
+
+def backfill_book_images():
+    with app_db.LocalSession() as session:
+        for book in session.query(app_db.models.Book).order_by(
+            app_db.models.Book.book_id
+        ):
+            legacy_dir = config.IMAGES_BOOKS_PATH + book.book_name
+            if not os.path.isdir(legacy_dir):
+                continue
+
+            gallery = sorted(
+                (f for f in os.listdir(legacy_dir) if re.match(r"^\d+\.", f)),
+                key=lambda f: int(f.split(".")[0]),
+            )
+            position = max((image.position for image in book.images), default=0)
+            for filename in gallery:
+                upload, stored = _store(os.path.join(legacy_dir, filename))
+                position += config.IMAGE_POSITION_STEP
+                session.add(
+                    app_db.models.BookImage(
+                        book_id=book.book_id,
+                        position=position,
+                        sha256=stored.sha256,
+                        format=stored.image_format,
+                        width=stored.width,
+                        height=stored.height,
+                        bytes=stored.bytes,
+                        original_bytes=upload.size,
+                    )
+                )
+
+            if book.book_cover_path.startswith(legacy_dir + "/") and os.path.isfile(
+                book.book_cover_path
+            ):
+                upload, stored = _store(book.book_cover_path)
+                book.book_cover_path = stored.path
+                book.book_cover_placeholder = stored.placeholder
+                book.book_cover_bytes = stored.bytes
+                book.book_cover_original_bytes = upload.size
+
+            session.commit()
+            # The old files are only removed once the rows pointing at blobs exist
+            shutil.rmtree(legacy_dir)
+            print(f"Moved {len(gallery)} images of '{book.book_name}'.")
+    services.invalidate_book_cache()
+
+
+if __name__ == "__main__":
+    backfill_book_images()
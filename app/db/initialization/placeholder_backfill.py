@@ -0,0 +1,39 @@
+"""Computes cover placeholders for books that do not have one yet.
+
+Run once after the book_cover_placeholder migration:
+
+    python -m app.db.initialization.placeholder_backfill
+"""
+
+import asyncio
+import io
+
+from PIL import UnidentifiedImageError
+
+from app import db as app_db
+from app import config, services
+from app.services import image_service
+
+
+def backfill_cover_placeholders():
+    with app_db.LocalSession() as session:
+        books = session.query(app_db.models.Book).filter(
+            app_db.models.Book.book_cover_placeholder.is_(None),
+            app_db.models.Book.book_cover_path != config.DEFAULT_COVER_PATH,
+        )
+        for book in books.order_by(app_db.models.Book.book_id):
+            path = book.book_cover_path
+            try:
+                contents = asyncio.run(image_service.storage_for(path).get(path))
+                placeholder = image_service.render_placeholder(io.BytesIO(contents))
+            except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+                print(f"Skipped '{book.book_name}': {e}")
+                continue
+            book.book_cover_placeholder = placeholder
+            session.commit()
+            print(f"Placeholder computed for '{book.book_name}'.")
+    services.invalidate_book_cache()
+
+
+if __name__ == "__main__":
+    backfill_cover_placeholders()
@@ -0,0 +1,59 @@
+"""books full text search
+
+Revision ID: e7b2d94f0c65
+Revises: a3f81c6e4d17
+Create Date: 2026-10-18 13:20:52.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app import config
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2d94f0c65'
+down_revision: Union[str, None] = 'a3f81c6e4d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must match the configuration search_books parses queries with
+SEARCH_LANGUAGE = config.SEARCH_LANGUAGE.replace("'", "''")
+SEARCH_DOCUMENT = f"""
+    setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce({{row}}book_name, '')), 'A') ||
+    setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce({{row}}book_author, '')), 'B') ||
+    setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce({{row}}book_description, '')), 'C')
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION books_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER books_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF book_name, book_author, book_description ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector_update();
+    """)
+    # Backfill existing rows before building the index
+    op.execute(f"UPDATE books SET search_vector = {SEARCH_DOCUMENT.format(row='')}")
+    op.create_index('ix_books_search_vector', 'books', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.execute("DROP TRIGGER IF EXISTS books_search_vector_trigger ON books")
+    op.execute("DROP FUNCTION IF EXISTS books_search_vector_update()")
+    op.drop_column('books', 'search_vector')
@@ -9,9 +9,14 @@ from sqlalchemy import (
     Float,
     Boolean,
     CheckConstraint,
+    Index,
+    DDL,
+    event,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from . import database
+from .. import config
 
 # Association table for many-to-many relationship between books and genres
 book_genres = Table(
@@ -19,6 +24,8 @@ book_genres = Table(
     database.Base.metadata,
     Column("book_id", Integer, ForeignKey("books.book_id"), primary_key=True),
     Column("genre_id", Integer, ForeignKey("genres.genre_id"), primary_key=True),
+    # Reverse lookup (genre -> books) used by the genre filter of the catalog
+    Index("ix_book_genres_genre_id_book_id", "genre_id", "book_id"),
 )
 
 # Association table for many-to-many relationship between books and users (wishlist)
@@ -71,14 +78,160 @@ class Book(database.Base):
     book_price = Column(Float, nullable=False)
     supply = Column(Integer, default=0)
     book_cover_path = Column(String, nullable=False)
+    # Tiny data URI drawn until the cover itself has loaded
+    book_cover_placeholder = Column(String, nullable=True)
+    # Size of the stored cover and of the file as uploaded; unset for the default cover
+    book_cover_bytes = Column(Integer, nullable=True)
+    book_cover_original_bytes = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(
         DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
     )
-    __table_args__ = (CheckConstraint("supply >= 0", name="check_supply_non_negative"),)
+    # Full-text document kept current by a trigger on PostgreSQL (plain text elsewhere)
+    search_vector = deferred(
+        Column(TSVECTOR().with_variant(String(), "sqlite"), nullable=True)
+    )
+    __table_args__ = (
+        CheckConstraint("supply >= 0", name="check_supply_non_negative"),
+        # Composite indexes backing keyset pagination for each sort_by mode
+        Index("ix_books_book_author_book_id", "book_author", "book_id"),
+        Index("ix_books_book_price_book_id", "book_price", "book_id"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     genres = relationship("Genre", secondary=book_genres)
     basket_items = relationship("BasketItem", back_populates="book")
+    images = relationship(
+        "BookImage",
+        back_populates="book",
+        order_by="(BookImage.position, BookImage.image_id)",
+        cascade="all, delete-orphan",
+    )
+
+
+class BookImage(database.Base):
+    """Gallery image of a book; the file itself is stored under its sha256."""
+
+    __tablename__ = "book_images"
+
+    image_id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(
+        Integer, ForeignKey("books.book_id", ondelete="CASCADE"), nullable=False
+    )
+    # Sparse sort key, moving an image only rewrites its own row
+    position = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    format = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)  # as stored, after normalization
+    original_bytes = Column(Integer, nullable=True)  # as uploaded
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    __table_args__ = (
+        Index("ix_book_images_book_id_position", "book_id", "position"),
+        Index("ix_book_images_sha256", "sha256"),
+    )
+
+    book = relationship("Book", back_populates="images")
+
+
+class ImageJob(database.Base):
+    """Queued processing of uploaded images, claimed by the image job workers."""
+
+    __tablename__ = "image_jobs"
+
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    book_id = Column(
+        Integer, ForeignKey("books.book_id", ondelete="CASCADE"), nullable=False
+    )
+    status = Column(String, nullable=False, default="queued")  # running, done
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Refreshed while the job runs; a stale one means the worker died
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    __table_args__ = (Index("ix_image_jobs_status_job_id", "status", "job_id"),)
+
+    items = relationship(
+        "ImageJobItem",
+        back_populates="job",
+        order_by="ImageJobItem.item_id",
+        cascade="all, delete-orphan",
+    )
+
+
+class ImageJobItem(database.Base):
+    """One uploaded file of an image job and its outcome."""
+
+    __tablename__ = "image_job_items"
+
+    item_id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(
+        Integer, ForeignKey("image_jobs.job_id", ondelete="CASCADE"), nullable=False
+    )
+    filename = Column(String, nullable=True)
+    upload_path = Column(String, nullable=False)
+    sha256 = Column(String(64), nullable=True)  # of the stored blob, once done
+    image_format = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # done, failed
+    error = Column(String, nullable=True)
+    image_id = Column(
+        Integer, ForeignKey("book_images.image_id", ondelete="SET NULL"), nullable=True
+    )
+    __table_args__ = (Index("ix_image_job_items_job_id", "job_id"),)
+
+    job = relationship("ImageJob", back_populates="items")
+
+
+class RefreshToken(database.Base):
+    """Refresh token of a login session; only its sha256 is stored.
+
+    Every refresh rotates the token, the tokens of one login share a family_id.
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    token_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False
+    )
+    family_id = Column(String(32), nullable=False)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    # Sliding expiry never moves past the session's maximum age
+    session_expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)  # rotated, presenting it again is reuse
+    revoked_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_family_id", "family_id"),
+    )
+
+
+# Keeps books.search_vector in sync when the table is created outside of Alembic
+event.listen(
+    Book.__table__,
+    "after_create",
+    DDL(f"""
+        CREATE OR REPLACE FUNCTION books_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('{config.SEARCH_LANGUAGE}', coalesce(NEW.book_name, '')), 'A') ||
+                setweight(to_tsvector('{config.SEARCH_LANGUAGE}', coalesce(NEW.book_author, '')), 'B') ||
+                setweight(to_tsvector('{config.SEARCH_LANGUAGE}', coalesce(NEW.book_description, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER books_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF book_name, book_author, book_description ON books
+        FOR EACH ROW EXECUTE FUNCTION books_search_vector_update();
+        """).execute_if(dialect="postgresql"),
+)
 
 
 class Genre(database.Base):
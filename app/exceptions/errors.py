@@ -1,3 +1,4 @@
+import re
 from typing import Any, Callable
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
@@ -54,6 +55,20 @@ class WrongCredentials(BookPythonError):
     pass
 
 
+class PasswordHashingBusy(BookPythonError):
+    """Too many logins are being processed, retry later."""
+
+    pass
+
+
+class TooManyRequests(BookPythonError):
+    """The client exceeded the rate limit of the route."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.headers = {"Retry-After": str(retry_after)}
+
+
 class UserNotVerified(BookPythonError):
     """The user is not verified. Check your email."""
 
@@ -72,6 +87,12 @@ class InvalidToken(BookPythonError):
     pass
 
 
+class InvalidRefreshToken(BookPythonError):
+    """The refresh token is unknown, expired, revoked or was already used."""
+
+    pass
+
+
 class OnlyAdminsAllowed(BookPythonError):
     """This is allowed only for admins."""
 
@@ -127,6 +148,41 @@ class BookAlreadyAssociated(BookPythonError):
     pass
 
 
+class UnsupportedImportFormat(BookPythonError):
+    """The import file must be CSV or NDJSON."""
+
+    pass
+
+
+class InvalidImportEncoding(BookPythonError):
+    """The import file must be encoded as UTF-8."""
+
+    pass
+
+
+class ImageProcessingBusy(BookPythonError):
+    """Too many images are being processed, retry later."""
+
+    pass
+
+
+class InvalidCursor(BookPythonError):
+    """The pagination cursor is malformed or belongs to a different sorting."""
+
+    pass
+
+
+class InvalidBookIds(BookPythonError):
+    """The ids are not a comma separated list of at most COVER_BATCH_MAX_IDS book IDs."""
+
+    def __init__(self):
+        super().__init__()
+        self.detail = {
+            "message": "ids must be a comma separated list of at most "
+            f"{config.COVER_BATCH_MAX_IDS} book IDs."
+        }
+
+
 # === GENRES ===
 class GenreNotFound(BookPythonError):
     """The genre was not found."""
@@ -177,6 +233,34 @@ class FileMustBeImage(BookPythonError):
     pass
 
 
+class ImageTooLarge(BookPythonError):
+    """The image exceeds IMAGE_UPLOAD_MAX_BYTES or IMAGE_MAX_PIXELS."""
+
+    def __init__(self):
+        super().__init__()
+        self.detail = {
+            "message": f"The image must be at most {config.IMAGE_UPLOAD_MAX_BYTES} "
+            f"bytes and {config.IMAGE_MAX_PIXELS} pixels."
+        }
+
+
+class ImageJobNotFound(BookPythonError):
+    """The image job was not found."""
+
+    pass
+
+
+class TooManyImages(BookPythonError):
+    """More than IMAGE_BATCH_MAX_FILES images were uploaded at once."""
+
+    def __init__(self):
+        super().__init__()
+        self.detail = {
+            "message": f"At most {config.IMAGE_BATCH_MAX_FILES} images can be "
+            "uploaded at once."
+        }
+
+
 class CantDeleteDefaultCover(BookPythonError):
     """It is impossible to delete the default cover."""
 
@@ -216,12 +300,24 @@ class UserDataUndefined(BookPythonError):
 
 
 ## === EXCEPTION HANDLER ===
+def error_code(exception: Exception) -> str:
+    """Snake_case code of an exception, as the API reports it (BookNotFound -> book_not_found)."""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", type(exception).__name__).lower()
+
+
 def create_exception_handler(
-    status_code: int, initial_detail: Any
+    status_code: int, initial_detail: Any, headers: dict[str, str] | None = None
 ) -> Callable[[Request, Exception], JSONResponse]:
 
     async def exception_handler(request: Request, exception: BookPythonError):
-
-        return JSONResponse(content=initial_detail, status_code=status_code)
+        # Exceptions may add headers that depend on the request, e.g. Retry-After
+        response_headers = {**(headers or {}), **getattr(exception, "headers", {})}
+        # and a message built from the config at the time they are raised
+        content = {**initial_detail, **getattr(exception, "detail", {})}
+        return JSONResponse(
+            content=content,
+            status_code=status_code,
+            headers=response_headers or None,
+        )
 
     return exception_handler
@@ -106,6 +106,27 @@ def register_exception_handlers(app):
             },
         ),
     )
+    app.add_exception_handler(
+        errors.PasswordHashingBusy,
+        errors.create_exception_handler(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Too many logins are being processed, retry later.",
+                "error_code": "password_hashing_busy",
+            },
+            headers={"Retry-After": str(config.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        ),
+    )
+    app.add_exception_handler(
+        errors.TooManyRequests,
+        errors.create_exception_handler(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            initial_detail={
+                "message": "Too many requests, retry later.",
+                "error_code": "too_many_requests",
+            },
+        ),
+    )
     app.add_exception_handler(
         errors.UserNotVerified,
         errors.create_exception_handler(
@@ -136,6 +157,16 @@ def register_exception_handlers(app):
             },
         ),
     )
+    app.add_exception_handler(
+        errors.InvalidRefreshToken,
+        errors.create_exception_handler(
+            status.HTTP_401_UNAUTHORIZED,
+            initial_detail={
+                "message": "The refresh token is not valid, log in again.",
+                "error_code": "invalid_refresh_token",
+            },
+        ),
+    )
     app.add_exception_handler(
         errors.OnlyAdminsAllowed,
         errors.create_exception_handler(
@@ -226,6 +257,68 @@ def register_exception_handlers(app):
             },
         ),
     )
+    app.add_exception_handler(
+        errors.UnsupportedImportFormat,
+        errors.create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "The import file must be CSV or NDJSON.",
+                "error_code": "unsupported_import_format",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        errors.InvalidImportEncoding,
+        errors.create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "The import file must be encoded as UTF-8.",
+                "error_code": "invalid_import_encoding",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        errors.ImageTooLarge,
+        errors.create_exception_handler(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            initial_detail={"error_code": "image_too_large"},
+        ),
+    )
+    app.add_exception_handler(
+        errors.TooManyImages,
+        errors.create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={"error_code": "too_many_images"},
+        ),
+    )
+    app.add_exception_handler(
+        errors.ImageProcessingBusy,
+        errors.create_exception_handler(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Too many images are being processed, retry later.",
+                "error_code": "image_processing_busy",
+            },
+            headers={"Retry-After": str(config.IMAGE_RETRY_AFTER_SECONDS)},
+        ),
+    )
+    app.add_exception_handler(
+        errors.InvalidCursor,
+        errors.create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "The pagination cursor is invalid for this query.",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        errors.InvalidBookIds,
+        errors.create_exception_handler(
+            status.HTTP_400_BAD_REQUEST,
+            initial_detail={"error_code": "invalid_book_ids"},
+        ),
+    )
     app.add_exception_handler(
         errors.GenreNotFound,
         errors.create_exception_handler(
@@ -286,6 +379,16 @@ def register_exception_handlers(app):
             },
         ),
     )
+    app.add_exception_handler(
+        errors.ImageJobNotFound,
+        errors.create_exception_handler(
+            status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                "message": "Image job not found.",
+                "error_code": "image_job_not_found",
+            },
+        ),
+    )
     app.add_exception_handler(
         errors.ImageNotFound,
         errors.create_exception_handler(
@@ -1,15 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from . import api, middleware
+from . import api, middleware, services
 from .exceptions import handlers
 import app.db as database
 from app.db.initialization.init_db import init_db
 
 ## === DB INIT ===
+services.calibrate_password_hashing()
 database.Base.metadata.create_all(bind=database.engine)
 init_db()
+services.build_suggestion_index()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services.start_image_job_workers()
+    yield
+    await services.stop_image_job_workers()
+
 
 ## === API INIT ===
 app = FastAPI(
+    lifespan=lifespan,
     title="Book Python API",
     description="API to handle operations in a book shop.",
     version="1.0",
@@ -61,3 +74,4 @@ app.include_router(api.wishlist_router)
 app.include_router(api.basket_router)
 
 app.include_router(api.order_router)
+app.include_router(api.job_router)
@@ -1,13 +1,95 @@
 from fastapi import FastAPI
 from fastapi.requests import Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-import time, logging
+from starlette.datastructures import Headers
+import re, time, logging
 
+from . import config
 
 logger = logging.getLogger("uvicorn.access")
 logger.disabled = True
 
+IMAGE_UPLOAD_ROUTE = re.compile(r"^/admin/books/\d+/(images|images/batch|cover)$")
+# Room for the multipart boundaries and part headers around the files
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def _upload_limit(scope):
+    if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+        return None
+    match = IMAGE_UPLOAD_ROUTE.match(scope["path"])
+    if not match:
+        return None
+    files = config.IMAGE_BATCH_MAX_FILES if match.group(1) == "images/batch" else 1
+    return files * config.IMAGE_UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+
+
+class UploadSizeLimitMiddleware:
+    """Stops image uploads at the size limit, before their body is spooled.
+
+    Starlette writes the whole multipart body to disk before the endpoint
+    runs, so the per-file check while staging comes too late to spare the
+    disk. Here the Content-Length is checked up front and the streamed bytes
+    are counted for chunked uploads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {
+                "message": f"The image must be at most {config.IMAGE_UPLOAD_MAX_BYTES} bytes.",
+                "error_code": "image_too_large",
+            },
+            status_code=413,
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        limit = _upload_limit(scope)
+        if limit is None:
+            return await self.app(scope, receive, send)
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            return await self._reject(scope, receive, send)
+
+        received = 0
+        exceeded = False
+        responded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # The form parser gives up as if the client had gone away
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message):
+            nonlocal responded
+            if not exceeded:
+                await send(message)
+            elif message["type"] == "http.response.start" and not responded:
+                # Whatever error the app made of the cut body, answer 413 instead
+                responded = True
+                await self._reject(scope, receive, send)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not responded:
+                await self._reject(scope, receive, send)
+
 
 def register_middleware(app: FastAPI):
 
@@ -25,6 +107,9 @@ def register_middleware(app: FastAPI):
         allow_methods=["*"],
         allow_headers=["*"],
         allow_credentials=True,
+        expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
     )
 
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
+
+    app.add_middleware(UploadSizeLimitMiddleware)
@@ -0,0 +1,159 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.requests import Request
+
+from . import config
+from .exceptions import errors
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency, only needed for RATE_LIMIT_BACKEND=redis
+    redis = None
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit: str):
+    """'5/minute' -> (5, 60.0); None when the limit is empty (disabled)."""
+    if not limit:
+        return None
+    count, period = limit.split("/")
+    return int(count), float(PERIODS[period.strip()])
+
+
+class MemoryBackend:
+    """Token buckets of this process; each worker counts on its own."""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        # key -> (tokens left, monotonic time of the last update)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: int, period: float):
+        """Takes a token, returns 0 or the seconds until the next one is available."""
+        rate = capacity / period
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # The least recently used bucket goes first, it has refilled the most
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+# Same algorithm as MemoryBackend.take, atomic and on the Redis clock
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by every worker through Redis."""
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package.")
+        self.prefix = "bookpython:rate:"
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: int, period: float):
+        try:
+            wait = await self._take(
+                keys=[self.prefix + key], args=[capacity, capacity / period]
+            )
+        except redis.RedisError as e:
+            # An unreachable Redis must not lock everybody out of their account
+            logging.warning("Rate limit check failed: %s", e)
+            return 0.0
+        return float(wait)
+
+
+def create_backend():
+    if config.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(config.REDIS_URL)
+    return MemoryBackend(config.RATE_LIMIT_MAX_BUCKETS)
+
+
+backend = create_backend()
+
+
+async def _request_field(request: Request, field: str):
+    if request.headers.get("content-type", "").startswith(
+        ("application/x-www-form-urlencoded", "multipart/form-data")
+    ):
+        value = (await request.form()).get(field)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            # Malformed or non-UTF-8 bodies are left to the endpoint's validation
+            return None
+        value = body.get(field) if isinstance(body, dict) else None
+    return value.strip().lower() if isinstance(value, str) else None
+
+
+class RateLimit:
+    """Route dependency throttling calls per client IP and per value of a field.
+
+    The field (e.g. the username of a login) is read from the form or JSON
+    body, so one account is protected even from many IPs. Runs before the
+    endpoint, a throttled call costs no hashing and sends no email.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        per_ip: str,
+        per_field: str = "",
+        field: str | None = None,
+        limiter_backend=None,
+    ):
+        self.scope = scope
+        self.per_ip = parse_limit(per_ip)
+        self.per_field = parse_limit(per_field) if field else None
+        self.field = field
+        self.backend = limiter_backend
+
+    async def _check(self, key: str, limit: tuple[int, float]):
+        wait = await (self.backend or backend).take(f"{self.scope}:{key}", *limit)
+        if wait:
+            raise errors.TooManyRequests(retry_after=math.ceil(wait))
+
+    async def __call__(self, request: Request):
+        if self.per_ip:
+            # Behind a proxy, run uvicorn with --proxy-headers to see real IPs
+            client_ip = request.client.host if request.client else "unknown"
+            await self._check(f"ip:{client_ip}", self.per_ip)
+        if self.per_field:
+            value = await _request_field(request, self.field)
+            if value:
+                await self._check(f"{self.field}:{value}", self.per_field)
@@ -1,12 +1,27 @@
 import datetime
-from pydantic import BaseModel, field_validator
-from typing import Optional, List
+import hashlib
+import os
+from pydantic import BaseModel, computed_field, field_validator
+from typing import Optional, List, Literal
 from .genre_schemas import GenreCreate
 
 from .. import config
 from ..exceptions import errors
 
 
+def cover_version(cover_path: str):
+    """Short content tag of a cover, changes whenever the cover does."""
+    if cover_path.startswith(config.IMAGES_BLOBS_PATH):
+        return os.path.splitext(os.path.basename(cover_path))[0][:16]
+    # Default and pre-blob covers are never rewritten in place
+    return hashlib.sha256(cover_path.encode()).hexdigest()[:16]
+
+
+def cover_url(book_id: int, cover_path: str, width: int | None = None):
+    url = f"/books/{book_id}/cover?v={cover_version(cover_path)}"
+    return url if width is None else f"{url}&w={width}"
+
+
 class BookModel(BaseModel):
     book_id: int
     book_name: str
@@ -15,15 +30,78 @@ class BookModel(BaseModel):
     book_price: float
     supply: int
     book_cover_path: str
+    book_cover_placeholder: Optional[str] = None
     genres: Optional[List[GenreCreate]] = None
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def cover_url(self) -> str:
+        return cover_url(self.book_id, self.book_cover_path)
+
     class Config:
         arbitrary_types_allowed = True
         from_attributes = True
 
 
+class BookImageModel(BaseModel):
+    image_id: int
+    position: int
+    sha256: str
+    format: str
+    width: int
+    height: int
+    bytes: int
+    original_bytes: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ImageUploadResult(BaseModel):
+    filename: Optional[str] = None
+    status: str  # done or failed
+    image_id: Optional[int] = None
+    sha256: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ImageJobItemModel(BaseModel):
+    item_id: int
+    filename: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    image_id: Optional[int] = None
+    sha256: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ImageJobModel(BaseModel):
+    job_id: int
+    book_id: int
+    status: str
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    items: List[ImageJobItemModel]
+
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def processed(self) -> int:
+        return sum(item.status != "queued" for item in self.items)
+
+    @computed_field
+    @property
+    def failed(self) -> int:
+        return sum(item.status == "failed" for item in self.items)
+
+
 class BookBase(BaseModel):
     book_name: Optional[str] = None
     book_author: Optional[str] = None
@@ -77,6 +155,11 @@ class BookHTML(BookCreate):
     book_id: int
     book_cover_path: str
 
+    @computed_field
+    @property
+    def cover_url(self) -> str:
+        return cover_url(self.book_id, self.book_cover_path)
+
 
 class BookUpdate(BookBase):
     pass
@@ -84,3 +167,40 @@ class BookUpdate(BookBase):
 
 class BookOut(BaseModel):
     book_id: int
+
+
+class BookSuggestion(BaseModel):
+    text: str
+    kind: Literal["title", "author"]
+    book_id: Optional[int] = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class PriceBucket(BaseModel):
+    min_price: float
+    max_price: float
+    count: int
+
+
+class BookFacets(BaseModel):
+    total: int
+    genres: List[FacetCount]
+    authors: List[FacetCount]
+    price_histogram: List[PriceBucket]
+
+
+class BulkImportError(BaseModel):
+    row: int
+    book_name: Optional[str] = None
+    error: str
+
+
+class BulkImportReport(BaseModel):
+    total_rows: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    errors: List[BulkImportError] = []
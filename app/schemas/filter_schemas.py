@@ -7,6 +7,8 @@ from .genre_schemas import GenreCreate
 class Pagination(BaseModel):
     skip: int = 0
     limit: int = 10
+    # Opaque keyset cursor returned in the X-Next-Cursor header; when set, skip is ignored
+    cursor: Optional[str] = None
 
 
 sort_by_modes = ["book_name", "book_author", "book_price"]
@@ -18,7 +20,11 @@ class SortingBooks:
         sort_by: Literal[*sort_by_modes] = Query(default="book_name"),
         order: Literal["asc", "desc"] = Query(default="asc"),
         genres: Optional[List[str]] = Query(default=None),
+        genres_match: Literal["any", "all"] = Query(default="any"),
     ):
         self.sort_by = sort_by or "created_at"
         self.order = order or "asc"
-        self.genres = [GenreCreate(name=genre) for genre in genres] if genres else []
+        self.genres = (
+            [GenreCreate(genre_name=genre) for genre in genres] if genres else []
+        )
+        self.genres_match = genres_match or "any"
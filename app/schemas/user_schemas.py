@@ -64,9 +64,27 @@ class UserOut(UserDecode):
     role: str
 
 
+class Principal(BaseModel):
+    """The caller of a request, as much of the user as authorization needs."""
+
+    user_id: int
+    username: str
+    role: str
+    disabled: bool
+    verified: bool
+
+    class Config:
+        from_attributes = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -1,6 +1,11 @@
 from .book_service import *
+from .suggestion_service import *
+from .image_service import *
 from .user_service import *
+from .token_service import *
 from .genre_service import *
 from .basket_service import *
 from .order_service import *
 from .wishlist_service import *
+from .bulk_service import *
+from .image_job_service import *
@@ -1,22 +1,83 @@
+import asyncio
+import base64
+import binascii
+import datetime
+import hashlib
+import io
+import json
 import mimetypes
-from pathlib import Path
-
-from sqlalchemy import asc, desc, select
-from sqlalchemy.orm import Session, joinedload
+import zipfile
+from typing import NamedTuple
+
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    asc,
+    case,
+    cast,
+    desc,
+    distinct,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import Session, selectinload
 from fastapi import Depends
 from typing import Annotated
 
-from starlette.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 
 from app import db as app_db
-from app import schemas, config
+from app import schemas, config, cache
 from app.exceptions import errors
-from PIL import Image
-import io
+from app.services.suggestion_service import suggestion_index
+from app.services import image_service
 import os
 import shutil
 import re
 
+book_detail_cache = cache.create_cache("book_detail")
+book_list_cache = cache.create_cache("book_list")
+# Holds stat results, so it is always local to the process
+cover_file_cache = cache.MemoryBackend(
+    config.COVER_MAP_MAX_ENTRIES, config.COVER_MAP_TTL_SECONDS
+)
+
+
+class CoverFile(NamedTuple):
+    path: str
+    media_type: str
+    version: str
+    stat: os.stat_result | None  # only for covers on the local disk
+
+
+def invalidate_book_cache(*book_ids: int):
+    for book_id in book_ids:
+        book_detail_cache.delete(book_id)
+        cover_file_cache.delete(book_id)
+    # Any change can move a book between listing pages, so listings are dropped as a whole
+    book_list_cache.clear()
+
+
+def get_book_cache_stats():
+    return [book_detail_cache.stats(), book_list_cache.stats()]
+
+
+def _book_list_cache_key(pagination: schemas.Pagination, sorting: schemas.SortingBooks):
+    return (
+        pagination.skip if not pagination.cursor else 0,
+        pagination.limit,
+        pagination.cursor,
+        sorting.sort_by,
+        sorting.order,
+        tuple(sorted({genre.genre_name for genre in sorting.genres})),
+        sorting.genres_match if sorting.genres else None,
+    )
+
 
 def create_book(book: schemas.BookCreate, current_session: Session):
     new_book = app_db.models.Book(**book.dict())
@@ -33,10 +94,11 @@ def create_book(book: schemas.BookCreate, current_session: Session):
     if check:
         raise errors.BookAlreadyExists()
 
-    os.mkdir(config.IMAGES_BOOKS_PATH + new_book.book_name)
     current_session.add(new_book)
     current_session.commit()
     current_session.refresh(new_book)
+    suggestion_index.add(new_book.book_id, new_book.book_name, new_book.book_author)
+    invalidate_book_cache(new_book.book_id)
     return new_book
 
 
@@ -58,7 +120,10 @@ def add_genre_for_book(book_id: int, genre_id: int, current_session: Session):
         raise errors.GenreAlreadyAssociated()
     stmt = app_db.models.book_genres.insert().values(book_id=book_id, genre_id=genre_id)
     current_session.execute(stmt)
+    # Genre membership is part of the book representation (and of its ETag)
+    book.updated_at = datetime.datetime.utcnow()
     current_session.commit()
+    invalidate_book_cache(book_id)
     return {"book": book.book_name, "genre": genre.genre_name}
 
 
@@ -84,43 +149,326 @@ def delete_genre_for_book(book_id: int, genre_id: int, current_session: Session)
         raise errors.GenreNotFound()
     if genre in book.genres:
         book.genres.remove(genre)
+        book.updated_at = datetime.datetime.utcnow()
         current_session.commit()
+        invalidate_book_cache(book_id)
     else:
         raise errors.GenreNotAssociated()
 
 
+def encode_book_cursor(book, sorting: schemas.SortingBooks):
+    value = getattr(book, sorting.sort_by)
+    payload = {
+        "sort_by": sorting.sort_by,
+        "order": sorting.order,
+        "value": value.isoformat() if isinstance(value, datetime.datetime) else value,
+        "book_id": book.book_id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _cursor_value(value, sort_by: str):
+    # Cursors come from clients, only a value of the column's own type reaches SQL
+    python_type = getattr(app_db.models.Book, sort_by).type.python_type
+    if python_type is datetime.datetime:
+        if not isinstance(value, str):
+            raise errors.InvalidCursor()
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            raise errors.InvalidCursor()
+    if python_type in (int, float):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, python_type)
+    if not valid:
+        raise errors.InvalidCursor()
+    return value
+
+
+def decode_book_cursor(cursor: str, sorting: schemas.SortingBooks):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, book_id = payload["value"], payload["book_id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise errors.InvalidCursor()
+    # A cursor is only meaningful for the ordering it was produced with
+    if (
+        payload.get("sort_by") != sorting.sort_by
+        or payload.get("order") != sorting.order
+    ):
+        raise errors.InvalidCursor()
+    if not isinstance(book_id, int) or isinstance(book_id, bool):
+        raise errors.InvalidCursor()
+    return _cursor_value(value, sorting.sort_by), book_id
+
+
+def get_next_book_cursor(
+    books: list, pagination: schemas.Pagination, sorting: schemas.SortingBooks
+):
+    if not books or len(books) < pagination.limit:
+        return None
+    return encode_book_cursor(books[-1], sorting)
+
+
+def _genre_filter_clause(sorting: schemas.SortingBooks):
+    book_genres = app_db.models.book_genres
+    genre_names = {genre.genre_name for genre in sorting.genres}
+    matching = (
+        select(book_genres.c.book_id)
+        .join(
+            app_db.models.Genre,
+            app_db.models.Genre.genre_id == book_genres.c.genre_id,
+        )
+        .where(app_db.models.Genre.genre_name.in_(genre_names))
+    )
+    if sorting.genres_match == "all":
+        # Books having every requested genre
+        matching = matching.group_by(book_genres.c.book_id).having(
+            func.count(distinct(book_genres.c.genre_id)) == len(genre_names)
+        )
+        return app_db.models.Book.book_id.in_(matching)
+    # Books having at least one requested genre
+    return exists(matching.where(book_genres.c.book_id == app_db.models.Book.book_id))
+
+
 def get_books(
     pagination: schemas.Pagination,
     sorting: Annotated[schemas.SortingBooks, Depends()],
     current_session: Session,
+):
+    return book_list_cache.get_or_set(
+        _book_list_cache_key(pagination, sorting),
+        lambda: [
+            schemas.BookModel.model_validate(book, from_attributes=True)
+            for book in _books_page_query(
+                pagination, sorting, current_session, app_db.models.Book
+            )
+            # Genres of the page are loaded with one extra batched IN query
+            .options(selectinload(app_db.models.Book.genres)).all()
+        ],
+    )
+
+
+def _books_page_query(
+    pagination: schemas.Pagination,
+    sorting: schemas.SortingBooks,
+    current_session: Session,
+    *entities,
 ):
     sort_column = getattr(app_db.models.Book, sorting.sort_by)
-    sort_order = asc(sort_column) if sorting.order == "asc" else desc(sort_column)
+    id_column = app_db.models.Book.book_id
+    if sorting.order == "asc":
+        sort_order = (asc(sort_column), asc(id_column))
+    else:
+        sort_order = (desc(sort_column), desc(id_column))
 
-    query = current_session.query(app_db.models.Book)
+    query = current_session.query(*entities)
 
-    # Join with genres and filter by genre names, if provided
+    # Filter by genre names with a semi-join, so books are never multiplied by their genres
     if sorting.genres:
-        genre_names = [genre.genre_name for genre in sorting.genres]
-        query = query.join(app_db.models.Book.genres).filter(
-            app_db.models.Genre.genre_name.in_(genre_names)
+        query = query.filter(_genre_filter_clause(sorting))
+
+    query = query.order_by(*sort_order)
+
+    # Keyset pagination: continue strictly after the (sort value, book_id) of the cursor,
+    # so every page costs the same regardless of its depth
+    if pagination.cursor:
+        value, last_id = decode_book_cursor(pagination.cursor, sorting)
+        if sorting.order == "asc":
+            query = query.filter(
+                or_(
+                    sort_column > value,
+                    and_(sort_column == value, id_column > last_id),
+                )
+            )
+        else:
+            query = query.filter(
+                or_(
+                    sort_column < value,
+                    and_(sort_column == value, id_column < last_id),
+                )
+            )
+    else:
+        query = query.offset(pagination.skip)
+
+    return query.limit(pagination.limit)
+
+
+def _http_date(value: datetime.datetime | None):
+    # Stored timestamps are naive UTC
+    return value.replace(tzinfo=datetime.timezone.utc) if value else None
+
+
+def get_books_freshness(
+    books: list[schemas.BookModel],
+    pagination: schemas.Pagination,
+    sorting: schemas.SortingBooks,
+):
+    # Derived from the cached page: every write bumps updated_at and drops the
+    # listings, so revalidating a warm page costs no query
+    digest = hashlib.sha1(repr(_book_list_cache_key(pagination, sorting)).encode())
+    for book in books:
+        digest.update(
+            f"|{book.book_id}:{book.updated_at.isoformat() if book.updated_at else ''}".encode()
         )
+    last_modified = max(
+        (book.updated_at for book in books if book.updated_at), default=None
+    )
+    return f'W/"books-{digest.hexdigest()[:20]}"', _http_date(last_modified)
+
+
+def get_book_freshness(book: schemas.BookModel):
+    updated_at = book.updated_at
+    version = updated_at.isoformat() if updated_at else "0"
+    digest = hashlib.sha1(f"{book.book_id}:{version}".encode()).hexdigest()[:20]
+    return f'W/"book-{digest}"', _http_date(updated_at)
+
+
+def get_book_facets(sorting: schemas.SortingBooks, current_session: Session):
+    key = (
+        "facets",
+        tuple(sorted({genre.genre_name for genre in sorting.genres})),
+        sorting.genres_match if sorting.genres else None,
+    )
+    return book_list_cache.get_or_set(
+        key, lambda: _query_book_facets(sorting, current_session)
+    )
+
+
+def _query_book_facets(sorting: schemas.SortingBooks, current_session: Session):
+    book = app_db.models.Book
+    book_genres = app_db.models.book_genres
+    count = func.count().label("count")
+
+    ratio = book.book_price / config.FACET_PRICE_BUCKET_SIZE
+    if current_session.get_bind().dialect.name == "postgresql":
+        bucket = cast(func.floor(ratio), Integer)
+    else:
+        # SQLite truncates on cast, which is the floor for non-negative prices
+        bucket = cast(ratio, Integer)
+
+    filtered = select(book.book_id, book.book_author, bucket.label("price_bucket"))
+    if sorting.genres:
+        filtered = filtered.where(_genre_filter_clause(sorting))
+    filtered = filtered.cte("filtered_books")
+
+    total_counts = select(
+        literal("total").label("facet"), literal("").label("value"), count
+    ).select_from(filtered)
+    genre_counts = (
+        select(
+            literal("genre").label("facet"),
+            app_db.models.Genre.genre_name.label("value"),
+            count,
+        )
+        .select_from(filtered)
+        .join(book_genres, book_genres.c.book_id == filtered.c.book_id)
+        .join(
+            app_db.models.Genre,
+            app_db.models.Genre.genre_id == book_genres.c.genre_id,
+        )
+        .group_by(app_db.models.Genre.genre_name)
+    )
+    top_authors = (
+        select(filtered.c.book_author.label("value"), count)
+        .group_by(filtered.c.book_author)
+        .order_by(desc("count"), asc(filtered.c.book_author))
+        .limit(config.FACET_AUTHORS_LIMIT)
+        .subquery()
+    )
+    author_counts = select(
+        literal("author").label("facet"), top_authors.c.value, top_authors.c.count
+    )
+    price_counts = select(
+        literal("price").label("facet"),
+        cast(filtered.c.price_bucket, String).label("value"),
+        count,
+    ).group_by(filtered.c.price_bucket)
+
+    # All facets come back from a single round trip
+    rows = current_session.execute(
+        union_all(total_counts, genre_counts, author_counts, price_counts)
+    ).all()
+
+    facets = {"total": 0, "genres": [], "authors": [], "price_histogram": []}
+    for facet, value, amount in rows:
+        if facet == "total":
+            facets["total"] = amount
+        elif facet == "genre":
+            facets["genres"].append(schemas.FacetCount(value=value, count=amount))
+        elif facet == "author":
+            facets["authors"].append(schemas.FacetCount(value=value, count=amount))
+        else:
+            low = int(value) * config.FACET_PRICE_BUCKET_SIZE
+            facets["price_histogram"].append(
+                schemas.PriceBucket(
+                    min_price=low,
+                    max_price=low + config.FACET_PRICE_BUCKET_SIZE,
+                    count=amount,
+                )
+            )
+    facets["genres"].sort(key=lambda item: (-item.count, item.value))
+    facets["authors"].sort(key=lambda item: (-item.count, item.value))
+    facets["price_histogram"].sort(key=lambda item: item.min_price)
+    return schemas.BookFacets(**facets)
+
+
+def search_books(
+    q: str,
+    pagination: schemas.Pagination,
+    current_session: Session,
+):
+    # Results are ordered by rank, which has no stable keyset; page with skip
+    if pagination.cursor:
+        raise errors.InvalidCursor()
+    book = app_db.models.Book
+    query = current_session.query(book)
+
+    if current_session.get_bind().dialect.name == "postgresql":
+        # Ranked full-text match served by the GIN index on books.search_vector
+        ts_query = func.websearch_to_tsquery(config.SEARCH_LANGUAGE, q)
+        rank = func.ts_rank_cd(book.search_vector, ts_query)
+        query = query.filter(book.search_vector.op("@@")(ts_query))
+    else:
+        # LIKE fallback for databases without full-text search (e.g. SQLite in tests)
+        escaped = re.sub(r"([\\%_])", r"\\\1", q)
+        pattern = f"%{escaped}%"
+        in_name = book.book_name.ilike(pattern, escape="\\")
+        in_author = book.book_author.ilike(pattern, escape="\\")
+        in_description = book.book_description.ilike(pattern, escape="\\")
+        rank = (
+            case((in_name, 4), else_=0)
+            + case((in_author, 2), else_=0)
+            + case((in_description, 1), else_=0)
+        )
+        query = query.filter(or_(in_name, in_author, in_description))
 
     query = (
-        query.options(joinedload(app_db.models.Book.genres))
-        .order_by(sort_order)
+        query.options(selectinload(book.genres))
+        .order_by(desc(rank), asc(book.book_id))
         .offset(pagination.skip)
         .limit(pagination.limit)
     )
-
     return query.all()
 
 
 def get_book_by_id(book_id: int, current_session: Session):
-    return current_session.query(app_db.models.Book).get(book_id)
+    def load():
+        book = current_session.query(app_db.models.Book).get(book_id)
+        if book is None:
+            return None
+        return schemas.BookModel.model_validate(book, from_attributes=True)
+
+    book = book_detail_cache.get_or_set(book_id, load)
+    if book is None:
+        raise errors.BookNotFound()
+    return book
 
 
-def delete_book_by_id(
+async def delete_book_by_id(
     book_id: int,
     current_session: Session,
 ):
@@ -131,9 +479,18 @@ def delete_book_by_id(
     )
     if not del_book:
         raise errors.BookNotFound()
-    shutil.rmtree(config.IMAGES_BOOKS_PATH + del_book.book_name)
+    legacy_dir = config.IMAGES_BOOKS_PATH + del_book.book_name
+    image_paths = [del_book.book_cover_path] + [
+        image_service.blob_path(image.sha256, image.format) for image in del_book.images
+    ]
     current_session.delete(del_book)
     current_session.commit()
+    for image_path in image_paths:
+        await _release_image_file(image_path, current_session)
+    # Folder of images uploaded before the blob store, if any
+    shutil.rmtree(legacy_dir, ignore_errors=True)
+    suggestion_index.remove(book_id)
+    invalidate_book_cache(book_id)
     return del_book
 
 
@@ -147,111 +504,299 @@ def update_book_by_id(
     )
     if not upd_book:
         raise errors.BookNotFound()
-    if upd_book.book_name != new_data.book_name:
-        os.rename(
-            config.IMAGES_BOOKS_PATH + upd_book.book_name,
-            config.IMAGES_BOOKS_PATH + new_data.book_name.title(),
-        )
+    legacy_dir = config.IMAGES_BOOKS_PATH + upd_book.book_name
+    if (
+        new_data.book_name
+        and upd_book.book_name != new_data.book_name.title()
+        and os.path.isdir(legacy_dir)
+    ):
+        # Only books from before the blob store still keep a per-title folder
+        new_dir = config.IMAGES_BOOKS_PATH + new_data.book_name.title()
+        os.rename(legacy_dir, new_dir)
+        if upd_book.book_cover_path.startswith(legacy_dir + "/"):
+            upd_book.book_cover_path = (
+                new_dir + upd_book.book_cover_path[len(legacy_dir) :]
+            )
     for key, value in new_data.dict(exclude_unset=True).items():
         setattr(upd_book, key, value)
     upd_book.book_name = upd_book.book_name.title()
     current_session.commit()
     current_session.refresh(upd_book)
+    suggestion_index.add(upd_book.book_id, upd_book.book_name, upd_book.book_author)
+    invalidate_book_cache(book_id)
     return upd_book
 
 
-def add_image_for_book(contents: bytes, book_id: int, current_session: Session):
-    image = Image.open(io.BytesIO(contents))
-    book = current_session.query(app_db.models.Book).get(book_id)
+def _blob_in_use(sha256: str, path: str, current_session: Session):
+    return current_session.query(
+        or_(
+            exists().where(app_db.models.BookImage.sha256 == sha256),
+            exists().where(app_db.models.Book.book_cover_path == path),
+        )
+    ).scalar()
 
-    extension = image.format.lower() if image.format else "jpg"
 
-    image_dir = config.IMAGES_BOOKS_PATH + book.book_name
+async def _release_image_file(path: str, current_session: Session):
+    """Deletes a stored image once nothing references it any more.
 
-    os.makedirs(image_dir, exist_ok=True)
+    Blobs are shared between duplicate uploads, so they are reference checked;
+    files from the per-book folders predate the blob store and are not shared.
+    """
+    if path == config.DEFAULT_COVER_PATH:
+        return
+    if path.startswith(config.IMAGES_BLOBS_PATH):
+        sha256 = os.path.splitext(os.path.basename(path))[0]
+        if _blob_in_use(sha256, path, current_session):
+            return
+    await image_service.delete_image(path)
 
-    existing_files = [
-        f for f in os.listdir(image_dir) if os.path.isfile(os.path.join(image_dir, f))
-    ]
-    new_index = len(existing_files)
-    filename = f"{new_index}.{extension}"
 
-    image_path = os.path.join(image_dir, filename)
-    image.save(image_path)
+def _last_image_position(book_id: int, current_session: Session):
+    last_position = (
+        current_session.query(func.max(app_db.models.BookImage.position))
+        .filter(app_db.models.BookImage.book_id == book_id)
+        .scalar()
+    )
+    return last_position or 0
 
-    return {"status": 200, "path": image_path}
 
+def insert_book_image(
+    book_id: int,
+    stored: image_service.StoredImage,
+    original_bytes: int,
+    current_session: Session,
+    position: int | None = None,
+):
+    """Adds a stored image to the gallery, by default at the end, without committing."""
+    if position is None:
+        position = _last_image_position(book_id, current_session)
+        position += config.IMAGE_POSITION_STEP
+    image = app_db.models.BookImage(
+        book_id=book_id,
+        position=position,
+        sha256=stored.sha256,
+        format=stored.image_format,
+        width=stored.width,
+        height=stored.height,
+        bytes=stored.bytes,
+        original_bytes=original_bytes,
+    )
+    current_session.add(image)
+    current_session.flush()
+    return image
 
-def get_images_for_book(book_id: int, current_session: Session):
+
+async def add_image_for_book(
+    upload: image_service.StagedUpload, book_id: int, current_session: Session
+):
     book = current_session.query(app_db.models.Book).get(book_id)
     if not book:
         raise errors.BookNotFound()
 
-    image_dir = config.IMAGES_BOOKS_PATH + book.book_name
+    # Decode, validation and encoding run in the image process pool
+    stored = await image_service.store_image(upload)
 
-    if not os.path.exists(image_dir):
-        return []
-
-    image_files = [
-        filename
-        for filename in os.listdir(image_dir)
-        if os.path.isfile(os.path.join(image_dir, filename))
-    ]
+    image = insert_book_image(book_id, stored, upload.size, current_session)
+    current_session.commit()
+    current_session.refresh(image)
 
-    return image_files
+    return {
+        "status": 200,
+        "image_id": image.image_id,
+        "path": stored.path,
+        "sha256": stored.sha256,
+        "bytes": stored.bytes,
+        "original_bytes": upload.size,
+    }
 
 
-def delete_image_by_id(
+async def add_images_for_book(
+    uploads: list[image_service.StagedUpload | errors.BookPythonError],
+    filenames: list[str | None],
     book_id: int,
-    image_id: int,
     current_session: Session,
 ):
+    """Stores many gallery images in one go and reports the outcome of each file.
+
+    Files are encoded in parallel, at most one per image pool worker so a big
+    batch cannot fill the pool queue on its own. The gallery positions are
+    then assigned in a single transaction, in upload order.
+    """
+    if not current_session.query(app_db.models.Book).get(book_id):
+        raise errors.BookNotFound()
+
+    slots = asyncio.Semaphore(config.IMAGE_WORKERS)
+
+    async def store(upload: image_service.StagedUpload | errors.BookPythonError):
+        if isinstance(upload, errors.BookPythonError):
+            return upload
+        async with slots:
+            return await image_service.store_image(upload)
+
+    stored_images = await asyncio.gather(
+        *(store(upload) for upload in uploads), return_exceptions=True
+    )
+    unexpected = [
+        result
+        for result in stored_images
+        if isinstance(result, BaseException)
+        and not isinstance(result, errors.BookPythonError)
+    ]
+    if unexpected:
+        # No row references the blobs stored so far, do not leave them behind
+        for stored in stored_images:
+            if isinstance(stored, image_service.StoredImage):
+                await _release_image_file(stored.path, current_session)
+        raise unexpected[0]
+
+    # Row lock on PostgreSQL, concurrent batches for a book get distinct positions
+    current_session.query(app_db.models.Book).filter(
+        app_db.models.Book.book_id == book_id
+    ).with_for_update().one()
+    position = _last_image_position(book_id, current_session)
+    results = []
+    for filename, upload, stored in zip(filenames, uploads, stored_images):
+        if isinstance(stored, errors.BookPythonError):
+            results.append(
+                schemas.ImageUploadResult(
+                    filename=filename, status="failed", error=errors.error_code(stored)
+                )
+            )
+            continue
+        position += config.IMAGE_POSITION_STEP
+        image = insert_book_image(
+            book_id, stored, upload.size, current_session, position
+        )
+        results.append(
+            schemas.ImageUploadResult(
+                filename=filename,
+                status="done",
+                image_id=image.image_id,
+                sha256=stored.sha256,
+            )
+        )
+    current_session.commit()
+    return results
+
+
+def get_images_for_book(book_id: int, current_session: Session):
     book = current_session.query(app_db.models.Book).get(book_id)
     if not book:
         raise errors.BookNotFound()
+    return book.images
 
-    image_dir = os.path.join(config.IMAGES_BOOKS_PATH, book.book_name)
 
-    target_image_path = None
-    for filename in os.listdir(image_dir):
-        if filename.startswith(f"{image_id}."):
-            target_image_path = os.path.join(image_dir, filename)
-            os.remove(target_image_path)
-            break
-
-    if not target_image_path:
+def _get_book_image(book_id: int, image_id: int, current_session: Session):
+    if not current_session.query(app_db.models.Book).get(book_id):
+        raise errors.BookNotFound()
+    image = (
+        current_session.query(app_db.models.BookImage)
+        .filter(
+            app_db.models.BookImage.book_id == book_id,
+            app_db.models.BookImage.image_id == image_id,
+        )
+        .first()
+    )
+    if not image:
         raise errors.ImageNotFound()
+    return image
 
-    for filename in os.listdir(image_dir):
-        if filename.startswith("cover"):
-            continue
 
-        current_id = int(filename.split(".")[0])
+async def get_image_for_book(
+    book_id: int,
+    image_id: int,
+    current_session: Session,
+    width: int | None = None,
+    image_format: str | None = None,
+    accept: str | None = None,
+):
+    image = _get_book_image(book_id, image_id, current_session)
+    image_path = image_service.blob_path(image.sha256, image.format)
+    return await image_service.image_variant_response(
+        image_path, width, image_format, accept
+    )
+
+
+def _respace_book_images(book_id: int, current_session: Session):
+    images = (
+        current_session.query(app_db.models.BookImage)
+        .filter(app_db.models.BookImage.book_id == book_id)
+        .order_by(app_db.models.BookImage.position, app_db.models.BookImage.image_id)
+    )
+    for index, image in enumerate(images):
+        image.position = (index + 1) * config.IMAGE_POSITION_STEP
+    current_session.flush()
+
+
+def move_image_for_book(
+    book_id: int,
+    image_id: int,
+    before_image_id: int | None,
+    current_session: Session,
+):
+    """Moves an image in front of another one, or to the end of the gallery.
+
+    Positions are sparse, so a move normally updates only the moved row.
+    """
+    image = _get_book_image(book_id, image_id, current_session)
+    BookImage = app_db.models.BookImage
+    siblings = current_session.query(BookImage.position).filter(
+        BookImage.book_id == book_id, BookImage.image_id != image_id
+    )
+    if before_image_id is None:
+        last = siblings.order_by(desc(BookImage.position)).first()
+        image.position = (last.position if last else 0) + config.IMAGE_POSITION_STEP
+    else:
+        before = _get_book_image(book_id, before_image_id, current_session)
+
+        def previous_position():
+            previous = (
+                siblings.filter(BookImage.position < before.position)
+                .order_by(desc(BookImage.position))
+                .first()
+            )
+            return previous.position if previous else 0
+
+        low = previous_position()
+        if before.position - low < 2:
+            # No gap left between the neighbours, space the gallery out again
+            _respace_book_images(book_id, current_session)
+            low = previous_position()
+        image.position = (low + before.position) // 2
+    current_session.commit()
+    current_session.refresh(image)
+    return image
+
 
-        if current_id > image_id:
-            new_filename = f"{current_id - 1}.{filename.split('.')[1]}"
-            old_image_path = os.path.join(image_dir, filename)
-            new_image_path = os.path.join(image_dir, new_filename)
-            os.rename(old_image_path, new_image_path)
+async def delete_image_by_id(
+    book_id: int,
+    image_id: int,
+    current_session: Session,
+):
+    image = _get_book_image(book_id, image_id, current_session)
+    image_path = image_service.blob_path(image.sha256, image.format)
+    current_session.delete(image)
+    current_session.commit()
+    await _release_image_file(image_path, current_session)
 
-    return {"status": 200, "path": target_image_path}
+    return {"status": 200, "path": image_path}
 
 
-def delete_all_images_for_book(
+async def delete_all_images_for_book(
     book_id: int, current_session: Session, delete_cover: bool = False
 ):
     book = current_session.query(app_db.models.Book).get(book_id)
     if not book:
         raise errors.BookNotFound()
-    image_dir = os.path.join(config.IMAGES_BOOKS_PATH, book.book_name)
-    image_list = []
-    for filename in os.listdir(image_dir):
-        if re.match(r"^\d", filename):
-            file_path = os.path.join(image_dir, filename)
-            os.remove(file_path)
-            image_list.append(file_path)
+    image_list = [
+        image_service.blob_path(image.sha256, image.format) for image in book.images
+    ]
+    book.images.clear()
+    current_session.commit()
+    for image_path in image_list:
+        await _release_image_file(image_path, current_session)
     if delete_cover:
-        delete_cover_for_book(book_id, current_session)
+        await delete_cover_for_book(book_id, current_session)
     return {"status": 200, "deleted": image_list, "cover_deleted": delete_cover}
 
 
@@ -262,70 +807,194 @@ def get_cover_path_for_book(book_id: int, current_session: Session):
     return book.book_cover_path
 
 
-def get_cover_image_for_book(book_id: int, current_session: Session):
-    book = (
-        current_session.query(app_db.models.Book)
-        .filter(app_db.models.Book.book_id == book_id)
-        .first()
-    )
-    if not book:
+async def get_cover_file(
+    book_id: int, current_session: Session, version: str | None = None
+):
+    """Resolves a book cover without touching the database or storage on a hit.
+
+    A version other than the cached one (a newer cover_url) forces a reload.
+    """
+    cover = cover_file_cache.get(book_id)
+    if cover is not cache.MISSING and version in (None, cover.version):
+        return cover
+
+    cover_path = current_session.execute(
+        select(app_db.models.Book.book_cover_path).where(
+            app_db.models.Book.book_id == book_id
+        )
+    ).scalar()
+    if cover_path is None:
         raise errors.BookNotFound()
+    local_path = image_service.storage_for(cover_path).local_path(cover_path)
+    try:
+        if local_path is not None:
+            stat = await run_in_threadpool(os.stat, local_path)
+        elif await image_service.storage_for(cover_path).size(cover_path) is None:
+            raise FileNotFoundError(cover_path)
+        else:
+            stat = None
+    except FileNotFoundError:
+        raise errors.ImageNotFound()
+
+    mime_type, _ = mimetypes.guess_type(cover_path)
+    cover = CoverFile(
+        path=cover_path,
+        media_type=mime_type or "application/octet-stream",
+        version=schemas.cover_version(cover_path),
+        stat=stat,
+    )
+    cover_file_cache.set(book_id, cover)
+    return cover
+
+
+def parse_book_ids(ids: str):
+    """Parses "1,2,3" into distinct book IDs, keeping their order."""
+    try:
+        book_ids = list(dict.fromkeys(int(book_id) for book_id in ids.split(",")))
+    except ValueError:
+        raise errors.InvalidBookIds()
+    if not 0 < len(book_ids) <= config.COVER_BATCH_MAX_IDS:
+        raise errors.InvalidBookIds()
+    return book_ids
+
+
+def _get_cover_paths(book_ids: list[int], current_session: Session):
+    # One IN query for the whole page instead of one lookup per cover
+    rows = current_session.execute(
+        select(app_db.models.Book.book_id, app_db.models.Book.book_cover_path).where(
+            app_db.models.Book.book_id.in_(book_ids)
+        )
+    )
+    return dict(rows.all())
+
+
+def get_cover_urls(book_ids: list[int], width: int | None, current_session: Session):
+    """Versioned cover URLs by book ID; unknown IDs are left out."""
+    if width is not None:
+        # Snap to a stored variant so every page asks for the same URLs
+        width = image_service.nearest_variant_width(width)
+    paths = _get_cover_paths(book_ids, current_session)
+    return {
+        book_id: schemas.cover_url(book_id, paths[book_id], width)
+        for book_id in book_ids
+        if book_id in paths
+    }
+
+
+def get_cover_urls_etag(cover_urls: dict[int, str]):
+    digest = hashlib.sha256(json.dumps(cover_urls).encode()).hexdigest()
+    return f'"{digest[:32]}"'
 
-    image_path = Path(book.book_cover_path)
-    if not image_path.is_file():
-        raise errors.ImageNotFound  # optional custom error
 
-    mime_type, _ = mimetypes.guess_type(str(image_path))
-    if not mime_type:
-        mime_type = "application/octet-stream"  # fallback
+def _write_cover_bundle(thumbnails: list[tuple[str, bytes]]):
+    buffer = io.BytesIO()
+    # Thumbnails are compressed images already, deflating them again is wasted CPU
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as bundle:
+        for name, contents in thumbnails:
+            bundle.writestr(name, contents)
+    return buffer.getvalue()
 
-    return FileResponse(
-        path=str(image_path),
-        media_type=mime_type,
-        filename=image_path.name,
+
+async def get_cover_bundle(
+    book_ids: list[int], width: int, image_format: str, current_session: Session
+):
+    """Zip of cover thumbnails named <book_id>.<ext>; missing covers are left out."""
+    paths = _get_cover_paths(book_ids, current_session)
+    extension = image_service.VARIANT_EXTENSIONS[image_format]
+    # One cold thumbnail per pool worker, a big bundle must not fill the queue alone
+    slots = asyncio.Semaphore(config.IMAGE_WORKERS)
+
+    async def thumbnail(book_id: int):
+        try:
+            async with slots:
+                key = await image_service.get_image_variant(
+                    paths[book_id], width, image_format
+                )
+            contents = await image_service.storage_for(key).get(key)
+        except (errors.ImageNotFound, FileNotFoundError):
+            return None
+        return f"{book_id}.{extension}", contents
+
+    thumbnails = await asyncio.gather(
+        *(thumbnail(book_id) for book_id in book_ids if book_id in paths)
+    )
+    return await run_in_threadpool(
+        _write_cover_bundle, [item for item in thumbnails if item is not None]
     )
 
 
-def update_cover_for_book(contents: bytes, book_id: int, current_session: Session):
+def get_cover_etag(cover: CoverFile, width: int | None, image_format: str | None):
+    if image_format is None:
+        return f'"{cover.version}"'
+    return f'"{cover.version}-{width}-{image_format}"'
+
+
+async def get_cover_response(
+    cover: CoverFile, width: int | None, image_format: str | None, headers: dict
+):
+    if image_format is None:
+        # The cached stat result spares FileResponse another stat call
+        return await image_service.image_file_response(
+            cover.path, cover.media_type, headers, cover.stat
+        )
+    key = await image_service.get_image_variant(cover.path, width, image_format)
+    return await image_service.image_file_response(
+        key, image_service.VARIANT_MEDIA_TYPES[image_format], headers
+    )
+
+
+async def update_cover_for_book(
+    upload: image_service.StagedUpload, book_id: int, current_session: Session
+):
     book = current_session.query(app_db.models.Book).get(book_id)
     if not book:
         raise errors.BookNotFound()
-    image = Image.open(io.BytesIO(contents))
-    extension = image.format.lower() if image.format else "jpg"
-    image_dir = config.IMAGES_BOOKS_PATH + book.book_name
-    filename = f"cover.{extension}"
-    image_path = image_dir + "/" + filename
-    image.save(image_path)
 
-    if book.book_cover_path == config.DEFAULT_COVER_PATH:
-        book.book_cover_path = image_path
+    # Decode, validation and encoding run in the image process pool
+    stored = await image_service.store_image(upload)
+    image_path = stored.path
+
+    old_cover = book.book_cover_path
+    book.book_cover_path = image_path
+    book.book_cover_placeholder = stored.placeholder
+    book.book_cover_bytes = stored.bytes
+    book.book_cover_original_bytes = upload.size
 
     current_session.commit()
     current_session.refresh(book)
+    if old_cover != image_path:
+        await _release_image_file(old_cover, current_session)
+    invalidate_book_cache(book_id)
 
-    return {"status": 200, "new_cover": image_path}
+    return {
+        "status": 200,
+        "new_cover": image_path,
+        "sha256": stored.sha256,
+        "bytes": stored.bytes,
+        "original_bytes": upload.size,
+    }
 
 
-def delete_cover_for_book(
+async def delete_cover_for_book(
     book_id: int,
     current_session: Session,
 ):
     book = current_session.query(app_db.models.Book).get(book_id)
+    if not book:
+        raise errors.BookNotFound()
     if book.book_cover_path == config.DEFAULT_COVER_PATH:
         raise errors.CantDeleteDefaultCover()
 
-    image_dir = config.IMAGES_BOOKS_PATH + book.book_name
-
-    for filename in os.listdir(image_dir):
-        if filename.startswith("cover"):
-            os.remove(os.path.join(image_dir, filename))
-            break
-
     old_cover = book.book_cover_path
     book.book_cover_path = config.DEFAULT_COVER_PATH
+    book.book_cover_placeholder = None
+    book.book_cover_bytes = None
+    book.book_cover_original_bytes = None
 
     current_session.commit()
     current_session.refresh(book)
+    await _release_image_file(old_cover, current_session)
+    invalidate_book_cache(book_id)
 
     return {
         "status": 200,
@@ -347,4 +1016,5 @@ def edit_supply_by_id(
     book.supply += amount
     current_session.commit()
     current_session.refresh(book)
+    invalidate_book_cache(book_id)
     return book
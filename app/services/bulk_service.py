@@ -0,0 +1,333 @@
+import codecs
+import csv
+import datetime
+import io
+import json
+import os
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import schemas, config
+from ..exceptions import errors
+from .. import db as app_db
+from .book_service import invalidate_book_cache
+from .suggestion_service import suggestion_index
+
+IMPORT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+# Same columns the import accepts, so an export can be loaded back as is
+EXPORT_FIELDS = [
+    "book_id",
+    "book_name",
+    "book_author",
+    "book_description",
+    "book_price",
+    "supply",
+    "created_at",
+    "updated_at",
+    "genres",
+]
+
+
+def detect_import_format(filename: str | None, content_type: str | None):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in IMPORT_FORMATS:
+        return IMPORT_FORMATS[extension]
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    raise errors.UnsupportedImportFormat()
+
+
+def _check_encoding(stream: BinaryIO):
+    """Rejects a file that is not UTF-8 before any of its rows is committed."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := stream.read(64 * 1024):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise errors.InvalidImportEncoding()
+    finally:
+        stream.seek(0)
+
+
+def _read_rows(stream: BinaryIO, file_format: str) -> Iterator[tuple[int, dict]]:
+    # The upload is decoded lazily, one line at a time
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        row_number = 0
+        while True:
+            row_number += 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:
+                # e.g. a NUL byte or an oversized field, the reader resumes on the next line
+                row = None
+            yield row_number, row
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            row = None
+        yield row_number, row
+
+
+def _split_genres(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = value.split(config.BULK_IMPORT_GENRES_SEPARATOR)
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def _row_book_name(row: dict):
+    # Rows failing validation may carry any JSON type here
+    book_name = row.get("book_name")
+    return None if book_name is None else str(book_name)
+
+
+def _describe_error(e: Exception):
+    if isinstance(e, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+            for error in e.errors()
+        )
+    return errors.error_code(e)
+
+
+def _dialect_insert(current_session: Session):
+    if current_session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _insert_batch(batch: list[dict], current_session: Session):
+    """Inserts a batch with one multi-row INSERT ... ON CONFLICT (book_name) DO NOTHING.
+
+    Returns the names that were actually inserted.
+    """
+    book_table = app_db.models.Book.__table__
+    insert = _dialect_insert(current_session)
+    now = datetime.datetime.utcnow()
+    stmt = (
+        insert(book_table)
+        .values(
+            [
+                {
+                    **item["book"],
+                    "book_cover_path": config.DEFAULT_COVER_PATH,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for item in batch
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["book_name"])
+        .returning(
+            book_table.c.book_id, book_table.c.book_name, book_table.c.book_author
+        )
+    )
+    try:
+        inserted = current_session.execute(stmt).all()
+
+        genre_ids_by_name = {
+            item["book"]["book_name"]: item["genre_ids"] for item in batch
+        }
+        links = [
+            {"book_id": row.book_id, "genre_id": genre_id}
+            for row in inserted
+            for genre_id in genre_ids_by_name[row.book_name]
+        ]
+        if links:
+            current_session.execute(app_db.models.book_genres.insert(), links)
+        current_session.commit()
+    except Exception as e:
+        current_session.rollback()
+        raise e
+
+    # Side effects only for committed rows
+    for row in inserted:
+        suggestion_index.add(row.book_id, row.book_name, row.book_author)
+    return {row.book_name for row in inserted}
+
+
+def import_books(
+    stream: BinaryIO,
+    file_format: str,
+    current_session: Session,
+    batch_size: int = config.BULK_IMPORT_BATCH_SIZE,
+):
+    _check_encoding(stream)
+    report = schemas.BulkImportReport()
+    # Genre names are resolved in memory, once per import
+    genre_ids = {
+        name.casefold(): genre_id
+        for genre_id, name in current_session.query(
+            app_db.models.Genre.genre_id, app_db.models.Genre.genre_name
+        )
+    }
+    seen_names = set()
+    batch = []
+
+    def flush():
+        inserted = _insert_batch(batch, current_session)
+        report.inserted += len(inserted)
+        for item in batch:
+            if item["book"]["book_name"] not in inserted:
+                report.skipped += 1
+                report.errors.append(
+                    schemas.BulkImportError(
+                        row=item["row"],
+                        book_name=item["book"]["book_name"],
+                        error="The book already exists.",
+                    )
+                )
+        batch.clear()
+
+    for row_number, row in _read_rows(stream, file_format):
+        report.total_rows += 1
+        if not isinstance(row, dict):
+            report.errors.append(
+                schemas.BulkImportError(row=row_number, error="Malformed row.")
+            )
+            continue
+        book_name = _row_book_name(row)
+        try:
+            book = schemas.BookCreate(
+                **{
+                    key: value
+                    for key, value in row.items()
+                    if key in schemas.BookCreate.model_fields
+                    and value not in ("", None)
+                }
+            )
+        except (ValidationError, errors.BookPythonError) as e:
+            report.errors.append(
+                schemas.BulkImportError(
+                    row=row_number, book_name=book_name, error=_describe_error(e)
+                )
+            )
+            continue
+
+        names = _split_genres(row.get("genres"))
+        unknown = [name for name in names if name.casefold() not in genre_ids]
+        if unknown:
+            report.errors.append(
+                schemas.BulkImportError(
+                    row=row_number,
+                    book_name=book_name,
+                    error=f"Unknown genres: {', '.join(unknown)}.",
+                )
+            )
+            continue
+
+        book_data = book.dict()
+        book_data["book_name"] = book_data["book_name"].title()
+        if book_data["book_name"] in seen_names:
+            report.skipped += 1
+            report.errors.append(
+                schemas.BulkImportError(
+                    row=row_number,
+                    book_name=book_data["book_name"],
+                    error="Duplicate book in the import file.",
+                )
+            )
+            continue
+        seen_names.add(book_data["book_name"])
+
+        batch.append(
+            {
+                "row": row_number,
+                "book": book_data,
+                "genre_ids": sorted({genre_ids[name.casefold()] for name in names}),
+            }
+        )
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    if report.inserted:
+        invalidate_book_cache()
+    return report
+
+
+def _export_query(dialect_name: str):
+    Book = app_db.models.Book
+    Genre = app_db.models.Genre
+    book_genres = app_db.models.book_genres
+    separator = literal(config.BULK_IMPORT_GENRES_SEPARATOR)
+    if dialect_name == "postgresql":
+        genres_agg = func.string_agg(
+            Genre.genre_name, postgresql.aggregate_order_by(separator, Genre.genre_name)
+        )
+    else:
+        genres_agg = func.group_concat(Genre.genre_name, separator)
+    # Correlated per book so rows stream out in primary key order without a sort
+    genres = (
+        select(genres_agg)
+        .select_from(book_genres)
+        .join(Genre, Genre.genre_id == book_genres.c.genre_id)
+        .where(book_genres.c.book_id == Book.book_id)
+        .scalar_subquery()
+    )
+    return select(
+        *(getattr(Book, field) for field in EXPORT_FIELDS[:-1]),
+        genres.label("genres"),
+    ).order_by(Book.book_id)
+
+
+def _export_row(row, file_format: str):
+    data = row._asdict()
+    data["created_at"] = data["created_at"] and data["created_at"].isoformat()
+    data["updated_at"] = data["updated_at"] and data["updated_at"].isoformat()
+    if file_format == "ndjson":
+        data["genres"] = _split_genres(data["genres"])
+    else:
+        data["genres"] = data["genres"] or ""
+    return data
+
+
+def export_books(file_format: str) -> Iterator[str]:
+    """Yields the whole catalog as CSV or NDJSON chunks.
+
+    Uses its own connection because the response outlives the request session.
+    """
+    connection = app_db.engine.connect()
+    try:
+        options = {"stream_results": True, "yield_per": config.EXPORT_YIELD_PER}
+        if connection.dialect.name == "postgresql":
+            # One statement already sees one snapshot; keep it explicit for readers
+            options["isolation_level"] = "REPEATABLE READ"
+        connection = connection.execution_options(**options)
+        result = connection.execute(_export_query(connection.dialect.name))
+
+        buffer = io.StringIO()
+        writer = None
+        if file_format == "csv":
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+        for partition in result.partitions():
+            for row in partition:
+                data = _export_row(row, file_format)
+                if writer:
+                    writer.writerow(data)
+                else:
+                    buffer.write(json.dumps(data, ensure_ascii=False) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        connection.close()
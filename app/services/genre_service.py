@@ -1,6 +1,10 @@
+import datetime
+
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from .. import schemas
 from .. import db as app_db
+from .book_service import book_detail_cache, invalidate_book_cache
 
 
 def create_genre(genre: schemas.GenreCreate, current_session: Session):
@@ -16,14 +20,33 @@ def get_genres(current_session: Session):
     return current_session.query(app_db.models.Genre).all()
 
 
+def _touch_books_with_genre(genre_id: int, current_session: Session):
+    # Books embed their genre names, so renaming/deleting a genre changes them too
+    current_session.execute(
+        update(app_db.models.Book)
+        .where(
+            app_db.models.Book.book_id.in_(
+                select(app_db.models.book_genres.c.book_id).where(
+                    app_db.models.book_genres.c.genre_id == genre_id
+                )
+            )
+        )
+        .values(updated_at=datetime.datetime.utcnow())
+    )
+
+
 def delete_genre_by_id(genre_id: int, current_session: Session):
     del_genre = (
         current_session.query(app_db.models.Genre)
         .filter(app_db.models.Genre.genre_id == genre_id)
         .first()
     )
+    _touch_books_with_genre(genre_id, current_session)
     current_session.delete(del_genre)
     current_session.commit()
+    # Genre names are embedded in every cached book payload
+    book_detail_cache.clear()
+    invalidate_book_cache()
     return del_genre
 
 
@@ -37,6 +60,10 @@ def update_genre_by_id(
     )
     for key, value in genre_data.dict().items():
         setattr(genre, key, value)
+    _touch_books_with_genre(genre_id, current_session)
     current_session.commit()
     current_session.refresh(genre)
+    # Genre names are embedded in every cached book payload
+    book_detail_cache.clear()
+    invalidate_book_cache()
     return genre
@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import shutil
+import uuid
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .. import config, schemas
+from .. import db as app_db
+from ..exceptions import errors
+from . import book_service, image_service
+
+_job_workers: list[asyncio.Task] = []
+_job_wakeup: asyncio.Event | None = None
+
+
+def enqueue_image_job(
+    book_id: int,
+    uploads: list[tuple[str | None, image_service.StagedUpload]],
+    current_session: Session,
+):
+    """Moves staged uploads into the spool and queues one job processing them in order."""
+    if not current_session.query(app_db.models.Book).get(book_id):
+        raise errors.BookNotFound()
+
+    os.makedirs(config.IMAGE_JOB_SPOOL_PATH, exist_ok=True)
+    job = app_db.models.ImageJob(book_id=book_id, status="queued")
+    for filename, upload in uploads:
+        spool_path = os.path.join(
+            config.IMAGE_JOB_SPOOL_PATH, f"{uuid.uuid4().hex}.upload"
+        )
+        shutil.move(upload.path, spool_path)
+        job.items.append(
+            app_db.models.ImageJobItem(
+                filename=filename,
+                upload_path=spool_path,
+                image_format=upload.image_format,
+                width=upload.width,
+                height=upload.height,
+                bytes=upload.size,
+                status="queued",
+            )
+        )
+    current_session.add(job)
+    current_session.commit()
+    current_session.refresh(job)
+    return job
+
+
+def enqueue_image_batch(
+    uploads: list[image_service.StagedUpload | errors.BookPythonError],
+    filenames: list[str | None],
+    book_id: int,
+    current_session: Session,
+):
+    """Queues the staged files of a batch upload.
+
+    Returns the job and the results of the files rejected while staging,
+    which never reach the queue.
+    """
+    staged, rejected = [], []
+    for filename, upload in zip(filenames, uploads):
+        if isinstance(upload, errors.BookPythonError):
+            rejected.append(
+                schemas.ImageUploadResult(
+                    filename=filename, status="failed", error=errors.error_code(upload)
+                )
+            )
+        else:
+            staged.append((filename, upload))
+    return enqueue_image_job(book_id, staged, current_session), rejected
+
+
+def get_image_job(job_id: int, current_session: Session):
+    job = current_session.query(app_db.models.ImageJob).get(job_id)
+    if not job:
+        raise errors.ImageJobNotFound()
+    return job
+
+
+def notify_image_job_workers():
+    """Wakes the workers of this process instead of waiting for their next poll."""
+    if _job_wakeup is not None:
+        _job_wakeup.set()
+
+
+def _claimable_jobs():
+    ImageJob = app_db.models.ImageJob
+    stale = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=config.IMAGE_JOB_LEASE_SECONDS
+    )
+    return or_(
+        ImageJob.status == "queued",
+        and_(ImageJob.status == "running", ImageJob.heartbeat_at < stale),
+    )
+
+
+def _claim_image_job():
+    """Marks the oldest waiting job as running and returns its ID, if there is one.
+
+    The conditional UPDATE makes the claim safe between processes sharing
+    the database, only one of them sees its row updated.
+    """
+    ImageJob = app_db.models.ImageJob
+    with app_db.LocalSession() as session:
+        while True:
+            job_id = session.execute(
+                select(ImageJob.job_id)
+                .where(_claimable_jobs())
+                .order_by(ImageJob.job_id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+            now = datetime.datetime.utcnow()
+            claimed = session.execute(
+                update(ImageJob)
+                .where(ImageJob.job_id == job_id, _claimable_jobs())
+                .values(
+                    status="running",
+                    started_at=func.coalesce(ImageJob.started_at, now),
+                    heartbeat_at=now,
+                )
+            ).rowcount
+            session.commit()
+            if claimed:
+                return job_id
+
+
+def _touch_image_job(job_id: int):
+    ImageJob = app_db.models.ImageJob
+    with app_db.LocalSession() as session:
+        session.execute(
+            update(ImageJob)
+            .where(ImageJob.job_id == job_id, ImageJob.status == "running")
+            .values(heartbeat_at=datetime.datetime.utcnow())
+        )
+        session.commit()
+
+
+async def _keep_image_job_lease(job_id: int):
+    # A file waiting on a busy pool must not make the job look abandoned
+    while True:
+        await asyncio.sleep(config.IMAGE_JOB_HEARTBEAT_SECONDS)
+        try:
+            await run_in_threadpool(_touch_image_job, job_id)
+        except Exception as e:
+            logging.warning("Image job %s heartbeat failed: %r", job_id, e)
+
+
+async def _store_when_idle(upload: image_service.StagedUpload):
+    # The pool turns away work when it is full, a queued job just waits its turn
+    while True:
+        try:
+            return await image_service.store_image(upload)
+        except errors.ImageProcessingBusy:
+            await asyncio.sleep(config.IMAGE_RETRY_AFTER_SECONDS)
+
+
+def _queued_image_job_items(job_id: int, current_session: Session):
+    """Book ID and staged files of the job still to process, None if the job is gone."""
+    job = current_session.get(app_db.models.ImageJob, job_id)
+    if job is None:
+        return None
+    # Files finished before a restart are not processed twice
+    return job.book_id, [
+        (
+            item.item_id,
+            image_service.StagedUpload(
+                item.upload_path,
+                item.bytes,
+                item.width,
+                item.height,
+                item.image_format,
+            ),
+        )
+        for item in job.items
+        if item.status == "queued"
+    ]
+
+
+def _save_image_job_item(
+    item_id: int,
+    book_id: int,
+    stored: image_service.StoredImage,
+    original_bytes: int,
+    current_session: Session,
+):
+    item = current_session.get(app_db.models.ImageJobItem, item_id)
+    # Image row and item outcome are committed together
+    image = book_service.insert_book_image(
+        book_id, stored, original_bytes, current_session
+    )
+    item.image_id = image.image_id
+    item.sha256 = stored.sha256
+    item.status = "done"
+    current_session.commit()
+
+
+def _fail_image_job_item(item_id: int, error: Exception, current_session: Session):
+    current_session.rollback()
+    item = current_session.get(app_db.models.ImageJobItem, item_id)
+    item.status = "failed"
+    item.error = errors.error_code(error)
+    current_session.commit()
+
+
+def _set_image_job_status(job_id: int, status: str, current_session: Session):
+    current_session.rollback()
+    job = current_session.get(app_db.models.ImageJob, job_id)
+    job.status = status
+    if status == "done":
+        job.finished_at = datetime.datetime.utcnow()
+    current_session.commit()
+
+
+async def _process_image_job_item(
+    item_id: int,
+    upload: image_service.StagedUpload,
+    book_id: int,
+    current_session: Session,
+):
+    try:
+        book = await run_in_threadpool(current_session.get, app_db.models.Book, book_id)
+        if not book:
+            raise errors.BookNotFound()
+        stored = await _store_when_idle(upload)
+        await run_in_threadpool(
+            _save_image_job_item,
+            item_id,
+            book_id,
+            stored,
+            upload.size,
+            current_session,
+        )
+    except Exception as e:
+        logging.warning("Image job item %s failed: %r", item_id, e)
+        await run_in_threadpool(_fail_image_job_item, item_id, e, current_session)
+    # Kept on cancellation, the item stays queued for the next worker
+    image_service.discard_upload(upload)
+
+
+async def _run_image_job(job_id: int):
+    with app_db.LocalSession() as session:
+        queued = await run_in_threadpool(_queued_image_job_items, job_id, session)
+        if queued is None:
+            return
+        book_id, items = queued
+        lease = asyncio.create_task(_keep_image_job_lease(job_id))
+        try:
+            for item_id, upload in items:
+                await _process_image_job_item(item_id, upload, book_id, session)
+        except asyncio.CancelledError:
+            # Shutting down, leave the rest of the job to the next worker
+            await run_in_threadpool(_set_image_job_status, job_id, "queued", session)
+            raise
+        finally:
+            lease.cancel()
+        await run_in_threadpool(_set_image_job_status, job_id, "done", session)
+
+
+async def _image_job_worker():
+    while True:
+        try:
+            job_id = await run_in_threadpool(_claim_image_job)
+            if job_id is not None:
+                await _run_image_job(job_id)
+                continue
+        except Exception as e:
+            # e.g. the database is unreachable, keep the worker alive and retry
+            logging.warning("Image job worker failed: %r", e)
+        _job_wakeup.clear()
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(_job_wakeup.wait(), config.IMAGE_JOB_POLL_SECONDS)
+
+
+def start_image_job_workers():
+    global _job_wakeup
+    _job_wakeup = asyncio.Event()
+    for _ in range(config.IMAGE_JOB_WORKERS):
+        _job_workers.append(asyncio.create_task(_image_job_worker()))
+
+
+async def stop_image_job_workers():
+    for worker in _job_workers:
+        worker.cancel()
+    await asyncio.gather(*_job_workers, return_exceptions=True)
+    _job_workers.clear()
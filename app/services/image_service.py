@@ -0,0 +1,554 @@
+import asyncio
+import base64
+import hashlib
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, NamedTuple
+
+from PIL import ExifTags, Image, ImageMath, ImageOps, UnidentifiedImageError, features
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, StreamingResponse
+
+from .. import config, storage
+from ..exceptions import errors
+
+IMAGE_VARIANTS_DIR = "variants"
+# Removed by normalization; the ICC profile is kept so colours do not shift
+METADATA_KEYS = {"exif", "xmp", "XML:com.adobe.xmp", "comment"}
+VARIANT_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+VARIANT_EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+
+# Pillow refuses anything larger while decoding, in the API and in pool workers
+Image.MAX_IMAGE_PIXELS = config.IMAGE_MAX_PIXELS
+
+# Blobs live in the configured storage; the default cover and the per-title
+# folders from before the blob store are always read from the working directory,
+# whatever STORAGE_LOCAL_ROOT is
+image_storage = storage.create_storage()
+local_storage = storage.LocalStorage("", config.STORAGE_THREADS)
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("image/webp", ".webp")
+
+_image_pool: ProcessPoolExecutor | None = None
+_pending_tasks = 0
+_pending_lock = threading.Lock()
+
+
+def storage_for(key: str):
+    if key.startswith(config.IMAGES_BLOBS_PATH):
+        return image_storage
+    return local_storage
+
+
+def supported_variant_formats():
+    """Configured variant formats this Pillow build can encode, in preference order."""
+    return [
+        image_format
+        for image_format in config.IMAGE_VARIANT_FORMATS
+        if image_format == "jpeg" or features.check(image_format)
+    ]
+
+
+def nearest_variant_width(width: int):
+    """Smallest configured width that still covers the requested one."""
+    widths = sorted(config.IMAGE_VARIANT_WIDTHS)
+    return next((candidate for candidate in widths if candidate >= width), widths[-1])
+
+
+def negotiate_variant_format(requested: str | None, accept: str | None):
+    formats = supported_variant_formats()
+    if requested in formats:
+        return requested
+    accept = accept or ""
+    for image_format in formats:
+        if VARIANT_MEDIA_TYPES[image_format] in accept:
+            return image_format
+    return "jpeg"
+
+
+def image_variant_path(source_path: str, width: int, image_format: str):
+    directory, filename = os.path.split(source_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory,
+        IMAGE_VARIANTS_DIR,
+        f"{stem}_{width}.{VARIANT_EXTENSIONS[image_format]}",
+    )
+
+
+def _save_variant(image: Image.Image, path: str, width: int, image_format: str):
+    variant = image.copy()
+    # Never upscale, the original is the largest variant we can offer
+    variant.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+    if image_format == "jpeg" and variant.mode != "RGB":
+        variant = variant.convert("RGB")
+    elif variant.mode not in ("RGB", "RGBA"):
+        variant = variant.convert("RGBA")
+    variant.save(path, format=image_format, quality=config.IMAGE_VARIANT_QUALITY)
+
+
+def _open_source(source: str | BinaryIO):
+    image = Image.open(source)
+    return ImageOps.exif_transpose(image)
+
+
+def _encode_placeholder(image: Image.Image):
+    placeholder = image.convert("RGB")
+    width = config.IMAGE_PLACEHOLDER_WIDTH
+    placeholder.thumbnail((width, width * 4), Image.Resampling.BOX)
+    image_format = "webp" if features.check("webp") else "jpeg"
+    buffer = io.BytesIO()
+    placeholder.save(
+        buffer, format=image_format, quality=config.IMAGE_PLACEHOLDER_QUALITY
+    )
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:{VARIANT_MEDIA_TYPES[image_format]};base64,{encoded}"
+
+
+def render_placeholder(source: str | BinaryIO):
+    """Few-hundred-byte data URI of the image, scaled up and blurred by the client."""
+    with _open_source(source) as image:
+        return _encode_placeholder(image)
+
+
+def render_image_variant(source: bytes, width: int, image_format: str):
+    """Encodes one variant into a temporary file and returns its path."""
+    fd, path = tempfile.mkstemp(
+        prefix="variant-", suffix="." + VARIANT_EXTENSIONS[image_format]
+    )
+    os.close(fd)
+    try:
+        with _open_source(io.BytesIO(source)) as image:
+            _save_variant(image, path, width, image_format)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def _put_and_discard(key: str, path: str, content_type: str | None = None):
+    try:
+        await storage_for(key).put_file(key, path, content_type)
+    finally:
+        os.remove(path)
+
+
+async def get_image_variant(source_key: str, width: int, image_format: str):
+    """Returns the variant key, generating it first for images uploaded before variants."""
+    key = image_variant_path(source_key, width, image_format)
+    store = storage_for(key)
+    if await store.size(key) is None:
+        try:
+            source = await storage_for(source_key).get(source_key)
+        except FileNotFoundError:
+            raise errors.ImageNotFound()
+        # Public GETs can ask for many cold variants at once, the bounded pool
+        # answers 503 + Retry-After instead of piling them up
+        path = await run_image_task(render_image_variant, source, width, image_format)
+        await _put_and_discard(key, path, VARIANT_MEDIA_TYPES[image_format])
+    return key
+
+
+async def delete_image(key: str):
+    """Deletes a stored image together with all of its variants."""
+    store = storage_for(key)
+    await store.delete(key)
+    directory, filename = os.path.split(key)
+    variants_prefix = os.path.join(
+        directory, IMAGE_VARIANTS_DIR, os.path.splitext(filename)[0] + "_"
+    )
+    for variant in await store.list_keys(variants_prefix):
+        await store.delete(variant)
+
+
+async def image_file_response(
+    key: str,
+    media_type: str | None = None,
+    headers: dict | None = None,
+    stat_result: os.stat_result | None = None,
+):
+    """Serves a stored image, straight from disk when the storage is local."""
+    store = storage_for(key)
+    local_path = store.local_path(key)
+    if local_path is not None:
+        return FileResponse(
+            path=local_path,
+            media_type=media_type,
+            headers=headers,
+            stat_result=stat_result,
+        )
+    size = await store.size(key)
+    if size is None:
+        raise errors.ImageNotFound()
+    return StreamingResponse(
+        store.stream(key),
+        media_type=media_type,
+        headers={**(headers or {}), "Content-Length": str(size)},
+    )
+
+
+async def image_variant_response(
+    source_key: str,
+    width: int | None = None,
+    image_format: str | None = None,
+    accept: str | None = None,
+):
+    if width is None and image_format is None:
+        if await storage_for(source_key).size(source_key) is None:
+            raise errors.ImageNotFound()
+        media_type, _ = mimetypes.guess_type(source_key)
+        return await image_file_response(source_key, media_type)
+
+    image_format = negotiate_variant_format(image_format, accept)
+    width = nearest_variant_width(width or max(config.IMAGE_VARIANT_WIDTHS))
+    key = await get_image_variant(source_key, width, image_format)
+    return await image_file_response(
+        key,
+        VARIANT_MEDIA_TYPES[image_format],
+        # The chosen format depends on Accept when ?format= is not given
+        headers={"Vary": "Accept"},
+    )
+
+
+class StagedUpload(NamedTuple):
+    """An upload copied to a temporary file, checked before any full decode."""
+
+    path: str
+    size: int
+    width: int
+    height: int
+    image_format: str
+
+
+def probe_image(path: str):
+    """Reads only the image header to get its dimensions and format."""
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            image_format = image.format
+    except Image.DecompressionBombError:
+        raise errors.ImageTooLarge()
+    except (UnidentifiedImageError, OSError):
+        raise errors.FileMustBeImage()
+    if width * height > config.IMAGE_MAX_PIXELS:
+        raise errors.ImageTooLarge()
+    return width, height, image_format
+
+
+def stage_upload(stream: BinaryIO):
+    """Copies an upload to a temporary file in chunks.
+
+    Memory stays at one chunk whatever the upload size; the copy stops as
+    soon as IMAGE_UPLOAD_MAX_BYTES is exceeded. The file is hashed later,
+    after normalization, since the blob is keyed by what is actually stored.
+    """
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as staged:
+            while chunk := stream.read(config.IMAGE_UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > config.IMAGE_UPLOAD_MAX_BYTES:
+                    raise errors.ImageTooLarge()
+                staged.write(chunk)
+        width, height, image_format = probe_image(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return StagedUpload(path, size, width, height, image_format)
+
+
+async def stage_uploads(files: list[UploadFile]):
+    """Stages several uploads side by side.
+
+    Returns a StagedUpload or, when the file is rejected, the API error for
+    each file, so one bad file does not fail the others.
+    """
+
+    async def stage(file: UploadFile):
+        if not (file.content_type or "").startswith("image/"):
+            return errors.FileMustBeImage()
+        return await run_in_threadpool(stage_upload, file.file)
+
+    uploads = await asyncio.gather(
+        *(stage(file) for file in files), return_exceptions=True
+    )
+    unexpected = [
+        upload
+        for upload in uploads
+        if isinstance(upload, BaseException)
+        and not isinstance(upload, errors.BookPythonError)
+    ]
+    if unexpected:
+        # The caller never sees these files, remove them here
+        discard_uploads(uploads)
+        raise unexpected[0]
+    return uploads
+
+
+def discard_upload(upload: StagedUpload):
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+
+
+def discard_uploads(uploads: list[StagedUpload | errors.BookPythonError]):
+    for upload in uploads:
+        if isinstance(upload, StagedUpload):
+            discard_upload(upload)
+
+
+def blob_path(sha256: str, image_format: str):
+    """Images are stored once under their content hash, whichever book uses them."""
+    return os.path.join(
+        config.IMAGES_BLOBS_PATH, sha256[:2], f"{sha256}.{image_format}"
+    )
+
+
+def _ssim(reference: Image.Image, candidate: Image.Image):
+    """Mean SSIM of the luma over 8x8 blocks, computed with Pillow alone."""
+    x = reference.convert("L").convert("F")
+    y = candidate.convert("L").convert("F")
+    blocks = (max(1, x.width // 8), max(1, x.height // 8))
+
+    def block_mean(image: Image.Image):
+        return image.resize(blocks, Image.Resampling.BOX)
+
+    mx, my = block_mean(x), block_mean(y)
+    xx = block_mean(ImageMath.lambda_eval(lambda v: v["x"] * v["x"], x=x))
+    yy = block_mean(ImageMath.lambda_eval(lambda v: v["y"] * v["y"], y=y))
+    xy = block_mean(ImageMath.lambda_eval(lambda v: v["x"] * v["y"], x=x, y=y))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim = ImageMath.lambda_eval(
+        lambda v: (
+            (2 * v["mx"] * v["my"] + c1)
+            * (2 * (v["xy"] - v["mx"] * v["my"]) + c2)
+            / (
+                (v["mx"] * v["mx"] + v["my"] * v["my"] + c1)
+                * (v["xx"] - v["mx"] * v["mx"] + v["yy"] - v["my"] * v["my"] + c2)
+            )
+        ),
+        mx=mx,
+        my=my,
+        xx=xx,
+        yy=yy,
+        xy=xy,
+    )
+    return ssim.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+
+
+def _save_jpeg(image: Image.Image, path: str, quality: int, icc_profile):
+    image.save(
+        path,
+        format="jpeg",
+        quality=quality,
+        optimize=True,
+        progressive=True,
+        icc_profile=icc_profile,
+    )
+
+
+def _save_for_target_ssim(image: Image.Image, path: str, icc_profile):
+    """Binary search of the lowest quality that still reaches IMAGE_TARGET_SSIM."""
+    low, high = config.IMAGE_MIN_QUALITY, config.IMAGE_MAX_QUALITY
+    while low < high:
+        quality = (low + high) // 2
+        _save_jpeg(image, path, quality, icc_profile)
+        with Image.open(path) as encoded:
+            if _ssim(image, encoded) >= config.IMAGE_TARGET_SSIM:
+                high = quality
+            else:
+                low = quality + 1
+    _save_jpeg(image, path, low, icc_profile)
+
+
+def normalize_image(source_path: str, target_path: str):
+    """Auto-orients an upload, strips its metadata, caps its size and re-encodes it.
+
+    Opaque images become quality-targeted JPEGs, transparent ones optimized
+    PNGs. Returns the format written, or None when the original should be
+    kept: animations, and uploads that needed no change and would only grow.
+    """
+    with Image.open(source_path) as original:
+        if getattr(original, "is_animated", False):
+            return None
+        needs_change = (
+            bool(METADATA_KEYS & original.info.keys())
+            or original.getexif().get(ExifTags.Base.Orientation, 1) != 1
+            or max(original.size) > config.IMAGE_MAX_DIMENSION
+        )
+        icc_profile = original.info.get("icc_profile")
+        has_alpha = original.mode in ("RGBA", "LA", "PA") or (
+            "transparency" in original.info
+        )
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail(
+            (config.IMAGE_MAX_DIMENSION, config.IMAGE_MAX_DIMENSION),
+            Image.Resampling.LANCZOS,
+        )
+        if has_alpha:
+            image_format = "png"
+            image.convert("RGBA").save(
+                target_path, format="png", optimize=True, icc_profile=icc_profile
+            )
+        else:
+            image_format = "jpeg"
+            if image.mode != "L":
+                image = image.convert("RGB")
+            _save_for_target_ssim(image, target_path, icc_profile)
+
+    if not needs_change and os.path.getsize(target_path) >= os.path.getsize(
+        source_path
+    ):
+        return None
+    return image_format
+
+
+def _file_sha256(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(config.IMAGE_UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PreparedImage(NamedTuple):
+    """An upload normalized and rendered to temporary files, ready to be stored."""
+
+    key: str
+    image_format: str
+    path: str
+    sha256: str
+    width: int
+    height: int
+    bytes: int
+    tmp_dir: str
+    variants: list[tuple[str, str]]  # (key, path)
+    placeholder: str
+
+
+def prepare_image(source_path: str):
+    """Validates and normalizes a staged upload and renders all of its variants.
+
+    Runs inside the image process pool, so it only takes picklable arguments
+    and never talks to the storage itself. The blob is keyed by the hash of
+    the normalized file.
+    """
+    try:
+        with Image.open(source_path) as image:
+            image.load()
+            image_format = (image.format or "jpeg").lower()
+    except Image.DecompressionBombError:
+        raise errors.ImageTooLarge()
+    except (UnidentifiedImageError, OSError):
+        raise errors.FileMustBeImage()
+
+    tmp_dir = tempfile.mkdtemp(prefix="variants-")
+    try:
+        path = os.path.join(tmp_dir, "normalized")
+        normalized_format = normalize_image(source_path, path)
+        if normalized_format is None:
+            path = source_path
+        else:
+            image_format = normalized_format
+        sha256 = _file_sha256(path)
+        key = blob_path(sha256, image_format)
+
+        variants = []
+        with _open_source(path) as image:
+            width, height = image.size
+            for variant_width in config.IMAGE_VARIANT_WIDTHS:
+                for variant_format in supported_variant_formats():
+                    variant_key = image_variant_path(key, variant_width, variant_format)
+                    variant_path = os.path.join(tmp_dir, os.path.basename(variant_key))
+                    _save_variant(image, variant_path, variant_width, variant_format)
+                    variants.append((variant_key, variant_path))
+            placeholder = _encode_placeholder(image)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return PreparedImage(
+        key,
+        image_format,
+        path,
+        sha256,
+        width,
+        height,
+        os.path.getsize(path),
+        tmp_dir,
+        variants,
+        placeholder,
+    )
+
+
+class StoredImage(NamedTuple):
+    path: str
+    image_format: str
+    placeholder: str
+    sha256: str
+    width: int
+    height: int
+    bytes: int
+
+
+async def store_image(upload: StagedUpload):
+    """Normalizes a staged upload and stores it, with its variants, under its hash."""
+    prepared = await run_image_task(prepare_image, upload.path)
+    try:
+        store = storage_for(prepared.key)
+        # An identical image already shares the stored file and its variants
+        if await store.size(prepared.key) is None:
+            media_type, _ = mimetypes.guess_type(prepared.key)
+            await store.put_file(prepared.key, prepared.path, media_type)
+            # Uploads are network bound on S3, run them side by side
+            await asyncio.gather(
+                *(
+                    store.put_file(
+                        variant_key, path, mimetypes.guess_type(variant_key)[0]
+                    )
+                    for variant_key, path in prepared.variants
+                )
+            )
+    finally:
+        shutil.rmtree(prepared.tmp_dir, ignore_errors=True)
+    return StoredImage(
+        prepared.key,
+        prepared.image_format,
+        prepared.placeholder,
+        prepared.sha256,
+        prepared.width,
+        prepared.height,
+        prepared.bytes,
+    )
+
+
+def _get_image_pool():
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=config.IMAGE_WORKERS)
+    return _image_pool
+
+
+async def run_image_task(fn, *args):
+    """Runs fn in the image process pool, failing fast once the queue is full."""
+    global _image_pool, _pending_tasks
+    with _pending_lock:
+        if _pending_tasks >= config.IMAGE_WORKERS + config.IMAGE_QUEUE_LIMIT:
+            raise errors.ImageProcessingBusy()
+        _pending_tasks += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_image_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OOM killer), start a fresh pool next time
+        _image_pool = None
+        raise
+    finally:
+        with _pending_lock:
+            _pending_tasks -= 1
@@ -1,13 +1,12 @@
-import time
-
 from pydantic import EmailStr
 from sqlalchemy.orm import Session, selectinload
 
 from .. import config, mail
+from .book_service import invalidate_book_cache
 from ..exceptions import errors
 from ..db import models
 from ..db.models import Order, Book
-from ..schemas import OrderCreate, OrderItemRead
+from ..schemas import OrderCreate, OrderItemRead, cover_url
 from sqlalchemy import insert
 
 
@@ -65,6 +64,9 @@ def create_order(order_data: OrderCreate, current_session: Session):
         current_session.rollback()
         raise e
 
+    # Supply of the ordered books changed
+    invalidate_book_cache(*book_ids)
+
     return order
 
 
@@ -96,11 +98,13 @@ async def send_order_information_email(
     items_str = ""
     for item in items:
         item_link = f"http://{config.DOMAIN}/books/{item.book.book_id}"
-        cover_url = f"http://{config.DOMAIN}/books/{item.book.book_id}/cover?ts={int(time.time())}"
+        # Items are ORM rows, so the URL is built from the book columns
+        cover_path = cover_url(item.book.book_id, item.book.book_cover_path)
+        cover_link = f"http://{config.DOMAIN}{cover_path}"
         items_str += f"""
         <div style="margin-bottom: 15px;">
             <a href="{item_link}" style="text-decoration: none; color: inherit;">
-                <img src="{cover_url}" width="100" style="display: block; border: 1px solid #ccc; margin-bottom: 5px;" />
+                <img src="{cover_link}" width="100" style="display: block; border: 1px solid #ccc; margin-bottom: 5px;" />
                 <strong>{item.book.book_name} x {item.quantity} x {item.book.book_price}$</strong>
             </a>
         </div>
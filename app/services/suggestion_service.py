@@ -0,0 +1,122 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+from sqlalchemy.orm import Session
+
+from .. import schemas, config
+from .. import db as app_db
+
+
+def normalize_suggestion_text(text: str):
+    # Accent-insensitive, case-insensitive form with collapsed whitespace
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"\s+", " ", stripped).strip().casefold()
+
+
+class SuggestionIndex:
+    """In-process sorted index of normalized book titles and authors.
+
+    Entries are (normalized term, kind, display text, book id) tuples kept in a
+    sorted list, so a prefix lookup is a single bisect followed by a short scan.
+    Every word start of a title/author is indexed, so "house" finds "Crooked House".
+    """
+
+    def __init__(self):
+        self._entries: list[tuple[str, str, str, int]] = []
+        self._entries_by_book: dict[int, list[tuple[str, str, str, int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries_for(book_id: int, book_name: str, book_author: str):
+        entries = set()
+        for kind, display in (("title", book_name), ("author", book_author)):
+            words = normalize_suggestion_text(display).split(" ")
+            for start in range(len(words)):
+                term = " ".join(words[start:])
+                if term:
+                    entries.add((term, kind, display, book_id))
+        return sorted(entries)
+
+    def rebuild(self, books):
+        entries_by_book = {
+            book.book_id: self._entries_for(
+                book.book_id, book.book_name, book.book_author
+            )
+            for book in books
+        }
+        entries = sorted(
+            entry for book_entries in entries_by_book.values() for entry in book_entries
+        )
+        with self._lock:
+            self._entries = entries
+            self._entries_by_book = entries_by_book
+
+    def _remove_locked(self, book_id: int):
+        for entry in self._entries_by_book.pop(book_id, []):
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def add(self, book_id: int, book_name: str, book_author: str):
+        book_entries = self._entries_for(book_id, book_name, book_author)
+        with self._lock:
+            self._remove_locked(book_id)
+            for entry in book_entries:
+                bisect.insort(self._entries, entry)
+            self._entries_by_book[book_id] = book_entries
+
+    def remove(self, book_id: int):
+        with self._lock:
+            self._remove_locked(book_id)
+
+    def suggest(self, prefix: str, limit: int):
+        normalized = normalize_suggestion_text(prefix)
+        if not normalized:
+            return []
+        suggestions = []
+        seen = set()
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (normalized,))
+            while position < len(self._entries) and len(suggestions) < limit:
+                term, kind, display, book_id = self._entries[position]
+                position += 1
+                if not term.startswith(normalized):
+                    break
+                # The same author may be indexed for several books
+                key = (kind, display if kind == "author" else book_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+                suggestions.append(
+                    schemas.BookSuggestion(
+                        text=display,
+                        kind=kind,
+                        book_id=book_id if kind == "title" else None,
+                    )
+                )
+        return suggestions
+
+
+suggestion_index = SuggestionIndex()
+
+
+def build_suggestion_index(current_session: Session | None = None):
+    session = current_session or app_db.database.LocalSession()
+    try:
+        books = session.query(
+            app_db.models.Book.book_id,
+            app_db.models.Book.book_name,
+            app_db.models.Book.book_author,
+        ).all()
+        suggestion_index.rebuild(books)
+    finally:
+        if current_session is None:
+            session.close()
+    return len(books)
+
+
+def suggest_books(prefix: str, limit: int = config.SUGGESTIONS_DEFAULT_LIMIT):
+    return suggestion_index.suggest(prefix, min(limit, config.SUGGESTIONS_MAX_LIMIT))
@@ -0,0 +1,136 @@
+import datetime
+import hashlib
+import logging
+import secrets
+import uuid
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from .. import config
+from .. import db as app_db
+from ..exceptions import errors
+
+
+def _hash_refresh_token(token: str):
+    # The tokens are 256 random bits, a plain sha256 keeps a leaked table useless
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _issue_refresh_token(
+    user_id: int,
+    family_id: str,
+    session_expires_at: datetime.datetime,
+    current_session: Session,
+):
+    token = secrets.token_urlsafe(32)
+    now = datetime.datetime.utcnow()
+    current_session.add(
+        app_db.models.RefreshToken(
+            user_id=user_id,
+            family_id=family_id,
+            token_hash=_hash_refresh_token(token),
+            created_at=now,
+            expires_at=min(
+                now + datetime.timedelta(days=config.REFRESH_TOKEN_EXPIRE_DAYS),
+                session_expires_at,
+            ),
+            session_expires_at=session_expires_at,
+        )
+    )
+    return token
+
+
+def create_refresh_token(user_id: int, current_session: Session):
+    """Starts a new session for a password login and returns its refresh token."""
+    RefreshToken = app_db.models.RefreshToken
+    now = datetime.datetime.utcnow()
+    # Expired rows can no longer be presented, drop them while we are here
+    current_session.execute(
+        delete(RefreshToken).where(
+            RefreshToken.user_id == user_id, RefreshToken.expires_at <= now
+        )
+    )
+    token = _issue_refresh_token(
+        user_id,
+        uuid.uuid4().hex,
+        now + datetime.timedelta(days=config.REFRESH_TOKEN_MAX_AGE_DAYS),
+        current_session,
+    )
+    current_session.commit()
+    return token
+
+
+def rotate_refresh_token(token: str, current_session: Session):
+    """Exchanges a refresh token for a new one of the same session.
+
+    Returns the user and the new token. A token that was already rotated
+    revokes its whole session: either the client or an attacker holds a copy.
+    """
+    RefreshToken = app_db.models.RefreshToken
+    stored = (
+        current_session.query(RefreshToken)
+        .filter(RefreshToken.token_hash == _hash_refresh_token(token))
+        .first()
+    )
+    now = datetime.datetime.utcnow()
+    if stored is None or stored.revoked_at is not None or stored.expires_at <= now:
+        raise errors.InvalidRefreshToken()
+
+    # Conditional UPDATE, of two requests racing with the same token only one wins
+    rotated = current_session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_id == stored.token_id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(used_at=now)
+    ).rowcount
+    if not rotated:
+        logging.warning(
+            "Refresh token reused, revoking session %s of user %s",
+            stored.family_id,
+            stored.user_id,
+        )
+        _revoke(RefreshToken.family_id == stored.family_id, current_session)
+        raise errors.InvalidRefreshToken()
+
+    user = current_session.get(app_db.User, stored.user_id)
+    if user.disabled:
+        current_session.commit()
+        raise errors.UserNotActive()
+    new_token = _issue_refresh_token(
+        stored.user_id, stored.family_id, stored.session_expires_at, current_session
+    )
+    current_session.commit()
+    return user, new_token
+
+
+def _revoke(condition, current_session: Session):
+    RefreshToken = app_db.models.RefreshToken
+    revoked = current_session.execute(
+        update(RefreshToken)
+        .where(condition, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.datetime.utcnow())
+    ).rowcount
+    current_session.commit()
+    return revoked
+
+
+def revoke_refresh_token(token: str, current_session: Session):
+    """Logs out the session the token belongs to; unknown tokens are ignored."""
+    RefreshToken = app_db.models.RefreshToken
+    family_id = (
+        current_session.query(RefreshToken.family_id)
+        .filter(RefreshToken.token_hash == _hash_refresh_token(token))
+        .scalar()
+    )
+    if family_id is None:
+        return 0
+    return _revoke(RefreshToken.family_id == family_id, current_session)
+
+
+def revoke_refresh_tokens(user_id: int, current_session: Session):
+    """Logs out every session of the user, returns the number of revoked tokens."""
+    return _revoke(app_db.models.RefreshToken.user_id == user_id, current_session)
@@ -1,4 +1,9 @@
+import asyncio
 import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
 
 from fastapi import Depends
@@ -7,11 +12,20 @@ from pydantic import EmailStr
 from sqlalchemy.orm import Session
 from typing import Annotated
 
-from .. import schemas, config, mail
+from .. import schemas, config, mail, cache
 from ..exceptions import errors
 from .. import db as app_db
+from . import token_service
 import jwt
 
+# Username -> Principal, spares authenticated requests the users lookup
+principal_cache = cache.create_cache("principal", config.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(*usernames: str):
+    for username in usernames:
+        principal_cache.delete(username)
+
 
 def get_password_hash(password):
     return config.PWD_CONTEXT.hash(password)
@@ -21,9 +35,99 @@ def verify_password(plain_password, hashed_password):
     return config.PWD_CONTEXT.verify(plain_password, hashed_password)
 
 
-def create_user(user: schemas.UserCreate, current_session: Session):
+def _time_verify(password: str, hashed_password: str, attempts: int = 3):
+    timings = []
+    for _ in range(attempts):
+        started = time.perf_counter()
+        config.PWD_CONTEXT.verify(password, hashed_password)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def calibrate_password_hashing(target_ms: float | None = None):
+    """Raises the cost of the default scheme until a verify takes about target_ms.
+
+    Only the floor moves: hashes below it are rehashed on their next login,
+    stronger ones are kept, so processes that measured a slightly different
+    cost do not rehash each other's hashes. Returns the chosen cost, or None
+    when calibration is disabled.
+    """
+    target_ms = target_ms or config.PASSWORD_HASH_TARGET_MS
+    if not target_ms:
+        return None
+    handler = config.PWD_CONTEXT.handler()
+    probe = "calibration"
+    elapsed = _time_verify(probe, config.PWD_CONTEXT.hash(probe))
+    # bcrypt's cost is an exponent, argon2's time cost scales about linearly
+    if handler.rounds_cost == "log2":
+        rounds = handler.default_rounds + round(math.log2(target_ms / elapsed))
+    else:
+        rounds = round(handler.default_rounds * target_ms / elapsed)
+    # Never below the configured cost, a slow or busy host must not weaken hashes
+    floor = handler.min_desired_rounds or handler.min_rounds
+    rounds = max(floor, min(handler.max_rounds, rounds))
+    scheme = handler.name
+    config.PWD_CONTEXT.update(
+        **{f"{scheme}__default_rounds": rounds, f"{scheme}__min_rounds": rounds}
+    )
+    elapsed = _time_verify(probe, config.PWD_CONTEXT.hash(probe))
+    print(
+        f"Password hashing calibrated: {scheme} rounds={rounds}, {elapsed:.0f} ms."
+        " Pin it in the configuration to keep every worker on the same cost."
+    )
+    return rounds
+
+
+# bcrypt releases the GIL, so a few threads hash in parallel with the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_pending = 0
+_password_lock = threading.Lock()
+
+
+async def _run_password_task(fn, *args):
+    """Runs fn in the password hashing pool.
+
+    Fails fast once the queue is full, and gives up on a task that waited
+    longer than PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS for a free thread.
+    """
+    global _password_pending
+    with _password_lock:
+        if (
+            _password_pending
+            >= config.PASSWORD_HASH_WORKERS + config.PASSWORD_HASH_QUEUE_LIMIT
+        ):
+            raise errors.PasswordHashingBusy()
+        _password_pending += 1
+    deadline = time.monotonic() + config.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS
+
+    def run():
+        # Hashing after the deadline would only delay the tasks queued behind
+        if time.monotonic() > deadline:
+            raise errors.PasswordHashingBusy()
+        return fn(*args)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, run)
+    finally:
+        with _password_lock:
+            _password_pending -= 1
+
+
+async def hash_password(password: str):
+    return await _run_password_task(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str):
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+def create_user(
+    user: schemas.UserCreate, hashed_password: str, current_session: Session
+):
     new_user = app_db.User(**user.dict())
-    new_user.hashed_password = get_password_hash(user.hashed_password)
+    new_user.hashed_password = hashed_password
     current_session.add(new_user)
     current_session.commit()
     current_session.refresh(new_user)
@@ -62,10 +166,15 @@ def get_user_by_email(email: EmailStr, current_session: Session):
 
 
 def update_user(user: app_db.User, user_data: dict, current_session: Session):
+    old_username = user.username
     for k, v in user_data.items():
         setattr(user, k, v)
     current_session.commit()
     current_session.refresh(user)
+    # Role, disabled and password changes must not wait for the TTL
+    invalidate_principal(old_username, user.username)
+    if "hashed_password" in user_data or user_data.get("disabled"):
+        token_service.revoke_refresh_tokens(user.user_id, current_session)
     return user
 
 
@@ -81,12 +190,19 @@ def get_user(username: str, current_session: Session):
     raise errors.UserNotFound()
 
 
-def authenticate_user(username: str, password: str, current_session: Session):
+async def authenticate_user(username: str, password: str, current_session: Session):
     user = get_user(username, current_session)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await _run_password_task(
+        config.PWD_CONTEXT.verify_and_update, password, user.hashed_password
+    )
+    if not verified:
         return False
+    if new_hash:
+        # Old scheme or cost; the plain password is only at hand during a login
+        user.hashed_password = new_hash
+        current_session.commit()
     return user
 
 
@@ -101,10 +217,19 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def _load_principal(username: str, current_session: Session):
+    user = (
+        current_session.query(app_db.User)
+        .filter(app_db.User.username == username)
+        .first()
+    )
+    return schemas.Principal.model_validate(user) if user else None
+
+
 def get_current_user(
     token: Annotated[str, Depends(config.oauth2_scheme)],
     current_session: Session = Depends(app_db.database.get_db),
-):
+) -> schemas.Principal:
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
         username: str = payload.get("sub")
@@ -113,10 +238,14 @@ def get_current_user(
         token_data = schemas.TokenData(username=username)
     except InvalidTokenError:
         raise errors.WrongCredentials()
-    user = get_user(token_data.username, current_session)
-    if user is None:
-        raise errors.WrongCredentials()
-    return user
+    # The signature and expiry are checked on every request, only the user row is cached
+    principal = principal_cache.get_or_set(
+        token_data.username,
+        lambda: _load_principal(token_data.username, current_session),
+    )
+    if principal is None:
+        raise errors.UserNotFound()
+    return principal
 
 
 def get_current_active_user(
@@ -186,6 +315,7 @@ async def send_password_reset_email(user_email: EmailStr):
 def update_user_profile(
     user: app_db.User, user_update: schemas.UserUpdate, current_session: Session
 ):
+    old_username = user.username
     update_data = user_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user, key, value)
@@ -197,4 +327,5 @@ def update_user_profile(
 
     current_session.commit()
     current_session.refresh(user)
+    invalidate_principal(old_username, user.username)
     return user
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
+
+from . import config
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # optional dependency, only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+
+class LocalStorage:
+    """Image files on the local disk; blocking calls run in a small thread pool.
+
+    Keys are paths relative to the working directory, as stored in the database.
+    """
+
+    def __init__(self, root: str, max_workers: int):
+        self.root = root
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    def local_path(self, key: str):
+        return os.path.join(self.root, key)
+
+    def _put_file(self, key: str, source_path: str):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Copy next to the target and swap in, readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def _read(self, key: str):
+        with open(self.local_path(key), "rb") as file:
+            return file.read()
+
+    def _size(self, key: str):
+        try:
+            return os.stat(self.local_path(key)).st_size
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, key: str):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _list(self, prefix: str):
+        directory, name_prefix = os.path.split(self.local_path(prefix))
+        if not os.path.isdir(directory):
+            return []
+        key_dir = os.path.dirname(prefix)
+        return [
+            os.path.join(key_dir, name)
+            for name in sorted(os.listdir(directory))
+            if name.startswith(name_prefix)
+            and os.path.isfile(os.path.join(directory, name))
+        ]
+
+    async def put_file(
+        self, key: str, source_path: str, content_type: str | None = None
+    ):
+        await self._run(self._put_file, key, source_path)
+
+    async def get(self, key: str) -> bytes:
+        return await self._run(self._read, key)
+
+    async def size(self, key: str) -> int | None:
+        """Size in bytes, or None when the key does not exist."""
+        return await self._run(self._size, key)
+
+    async def delete(self, key: str):
+        await self._run(self._delete, key)
+
+    async def list_keys(self, prefix: str) -> list[str]:
+        """Keys starting with prefix, within the prefix's own folder."""
+        return await self._run(self._list, prefix)
+
+    async def stream(
+        self, key: str, chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        file = await self._run(open, self.local_path(key), "rb")
+        try:
+            while chunk := await self._run(file.read, chunk_size):
+                yield chunk
+        finally:
+            file.close()
+
+
+class S3Storage:
+    """Images in an S3-compatible bucket (AWS S3, MinIO, ...), shared by every node."""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None,
+        region: str | None,
+        prefix: str,
+        max_workers: int,
+    ):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'boto3' package.")
+        self.bucket = bucket
+        self.prefix = prefix
+        # boto3 clients are thread safe, the calls themselves are blocking
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage"
+        )
+
+    async def _run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: fn(*args, **kwargs)
+        )
+
+    def _key(self, key: str):
+        return self.prefix + key
+
+    def local_path(self, key: str):
+        return None
+
+    async def put_file(
+        self, key: str, source_path: str, content_type: str | None = None
+    ):
+        extra = {"ContentType": content_type} if content_type else None
+        await self._run(
+            self._client.upload_file,
+            source_path,
+            self.bucket,
+            self._key(key),
+            ExtraArgs=extra,
+        )
+
+    async def get(self, key: str) -> bytes:
+        try:
+            response = await self._run(
+                self._client.get_object, Bucket=self.bucket, Key=self._key(key)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise FileNotFoundError(key)
+            raise
+        return await self._run(response["Body"].read)
+
+    async def size(self, key: str) -> int | None:
+        try:
+            response = await self._run(
+                self._client.head_object, Bucket=self.bucket, Key=self._key(key)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["ContentLength"]
+
+    async def delete(self, key: str):
+        await self._run(
+            self._client.delete_object, Bucket=self.bucket, Key=self._key(key)
+        )
+
+    async def list_keys(self, prefix: str) -> list[str]:
+        def collect():
+            paginator = self._client.get_paginator("list_objects_v2")
+            return [
+                item["Key"][len(self.prefix) :]
+                for page in paginator.paginate(
+                    Bucket=self.bucket, Prefix=self._key(prefix), Delimiter="/"
+                )
+                for item in page.get("Contents", [])
+            ]
+
+        return await self._run(collect)
+
+    async def stream(
+        self, key: str, chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        response = await self._run(
+            self._client.get_object, Bucket=self.bucket, Key=self._key(key)
+        )
+        body = response["Body"]
+        try:
+            while chunk := await self._run(body.read, chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+
+def create_storage():
+    if config.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            config.S3_BUCKET,
+            config.S3_ENDPOINT_URL,
+            config.S3_REGION,
+            config.S3_KEY_PREFIX,
+            config.STORAGE_THREADS,
+        )
+    return LocalStorage(config.STORAGE_LOCAL_ROOT, config.STORAGE_THREADS)
@@ -0,0 +1,29 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from app import config
+from app.db import models
+from app.services import order_service
+
+
+def test_order_email_built_from_orm_items():
+    book = models.Book(
+        book_id=4,
+        book_name="Dune",
+        book_price=12.5,
+        book_cover_path="app/static/images/books/cover_not_available.jpg",
+    )
+    items = [models.OrderItem(order_id=9, book_id=4, book=book, quantity=2)]
+
+    with patch.object(
+        order_service.mail.mail_engine, "send_message", AsyncMock()
+    ) as send:
+        asyncio.run(
+            order_service.send_order_information_email(
+                "reader@example.com", 9, 25.0, items
+            )
+        )
+
+    body = send.call_args.args[0].body
+    assert f'src="http://{config.DOMAIN}/books/4/cover?v=' in body
+    assert "Dune x 2 x 12.5$" in body
@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import config, schemas, services
+from app import db as app_db
+from app.exceptions import errors
+from .test_conf import add_book, as_admin, as_user, client, db_session
+
+
+@pytest.mark.parametrize(
+    "filename, content_type, expected",
+    [
+        ("books.csv", None, "csv"),
+        ("books.JSONL", None, "ndjson"),
+        ("upload", "application/x-ndjson", "ndjson"),
+    ],
+)
+def test_detect_import_format(filename, content_type, expected):
+    assert services.detect_import_format(filename, content_type) == expected
+
+
+def test_detect_import_format_unsupported():
+    with pytest.raises(errors.UnsupportedImportFormat):
+        services.detect_import_format("books.xlsx", "application/octet-stream")
+
+
+def test_bulk_import_forbidden_for_users(as_user):
+    response = client.post(
+        "/admin/books/bulk", files={"file": ("books.csv", b"", "text/csv")}
+    )
+
+    assert response.status_code == 403
+
+
+def test_bulk_import_returns_report(as_admin):
+    report = schemas.BulkImportReport(total_rows=3, inserted=2, skipped=1)
+    with patch("app.services.import_books", return_value=report) as import_books:
+        response = client.post(
+            "/admin/books/bulk?batch_size=100",
+            files={"file": ("books.ndjson", b"{}\n", "application/x-ndjson")},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["inserted"] == 2
+        assert import_books.call_args.args[1] == "ndjson"
+        assert import_books.call_args.args[3] == 100
+
+
+def test_export_streams_ndjson_attachment(as_admin):
+    chunks = iter(['{"book_id": 1}\n', '{"book_id": 2}\n'])
+    with patch("app.services.export_books", return_value=chunks) as export_books:
+        response = client.get("/admin/books/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "attachment" in response.headers["content-disposition"]
+        assert response.text.splitlines() == ['{"book_id": 1}', '{"book_id": 2}']
+        export_books.assert_called_once_with("ndjson")
+
+
+def test_bulk_import_rejects_non_utf8_before_committing():
+    session = MagicMock()
+    contents = "book_name\nCafé\n".encode("latin-1")
+
+    with pytest.raises(errors.InvalidImportEncoding):
+        services.import_books(io.BytesIO(contents), "csv", session)
+
+    session.execute.assert_not_called()
+
+
+def test_bulk_import_reports_malformed_rows():
+    limit = csv.field_size_limit(20)
+    try:
+        contents = b"book_name,supply\nShort,1\n" + b"x" * 50 + b",1\n"
+        report = services.import_books(io.BytesIO(contents), "csv", MagicMock())
+    finally:
+        csv.field_size_limit(limit)
+
+    assert report.total_rows == 2
+    assert [error.row for error in report.errors] == [1, 2]
+    assert report.errors[1].error == "Malformed row."
+
+
+def test_bulk_import_reports_non_string_book_name():
+    report = services.import_books(
+        io.BytesIO(b'{"book_name": 5}\n'), "ndjson", MagicMock()
+    )
+
+    assert report.errors[0].book_name == "5"
+
+
+def exported_rows(text: str, file_format: str):
+    if file_format == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.parametrize("file_format", ["csv", "ndjson"])
+def test_export_round_trips_through_import(
+    db_session, as_admin, monkeypatch, file_format
+):
+    monkeypatch.setattr(config, "EXPORT_YIELD_PER", 2)
+    fens = app_db.models.Genre(genre_name="Fenland")
+    moors = app_db.models.Genre(genre_name="Moorland")
+    description = 'Reeds, "sedges" and quillwort; a walk through the fens. ' * 2
+    books = [
+        add_book(db_session, "Fen One", "Ann Reed", description, 5, [fens, moors]),
+        add_book(db_session, "Fen Two", "Bo Marsh", description, 12.5, [fens]),
+        add_book(db_session, "Fen Three", "Cy Heath", description, 19, []),
+    ]
+    db_session.commit()
+    names = [book.book_name for book in books]
+
+    chunks = list(services.export_books(file_format))
+    response = client.get("/admin/books/export", params={"format": file_format})
+
+    assert response.status_code == 200
+    assert response.text == "".join(chunks)
+    # Rows leave in batches of EXPORT_YIELD_PER, not as one result
+    assert len(chunks) > 1
+    rows = exported_rows(response.text, file_format)
+    if file_format == "csv":
+        assert response.text.splitlines()[0] == ",".join(services.EXPORT_FIELDS)
+    exported = {row["book_name"]: row for row in rows if row["book_name"] in names}
+    genres = exported["Fen One"]["genres"]
+    assert (genres.split("|") if file_format == "csv" else genres) == [
+        "Fenland",
+        "Moorland",
+    ]
+
+    for book in books:
+        db_session.delete(book)
+    db_session.commit()
+    report = services.import_books(
+        io.BytesIO(response.content), file_format, db_session
+    )
+
+    # Books still in the catalog are skipped, the deleted ones come back as exported
+    assert report.total_rows == len(rows)
+    assert report.inserted + report.skipped == len(rows)
+    assert {error.error for error in report.errors} <= {"The book already exists."}
+    assert not [error for error in report.errors if error.book_name in names]
+    Book = app_db.models.Book
+    restored = {
+        book.book_name: book
+        for book in db_session.query(Book).filter(Book.book_name.in_(names))
+    }
+    for name in names:
+        row = exported[name]
+        assert restored[name].book_author == row["book_author"]
+        assert restored[name].book_description == description
+        assert restored[name].book_price == float(row["book_price"])
+    assert sorted(genre.genre_name for genre in restored["Fen One"].genres) == [
+        "Fenland",
+        "Moorland",
+    ]
+    assert restored["Fen Three"].genres == []
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import cache
+
+
+def test_cache_read_through_counts_hits_and_misses():
+    book_cache = cache.Cache("test", cache.MemoryBackend(10, 60))
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {"book_id": 1}
+
+    assert book_cache.get_or_set(1, loader) == {"book_id": 1}
+    assert book_cache.get_or_set(1, loader) == {"book_id": 1}
+    assert len(loads) == 1
+    assert book_cache.stats()["hits"] == 1
+    assert book_cache.stats()["misses"] == 1
+
+
+def test_cache_does_not_store_missing_rows():
+    book_cache = cache.Cache("test", cache.MemoryBackend(10, 60))
+
+    assert book_cache.get_or_set(1, lambda: None) is None
+    assert book_cache.get_or_set(1, lambda: "created") == "created"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = cache.MemoryBackend(2, 60)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+
+    assert backend.get("b") is cache.MISSING
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memory_backend_expires_entries():
+    backend = cache.MemoryBackend(2, 60)
+    with patch("app.cache.time.monotonic", return_value=1000.0):
+        backend.set("a", 1)
+    with patch("app.cache.time.monotonic", return_value=1061.0):
+        assert backend.get("a") is cache.MISSING
+
+
+def test_load_racing_an_invalidation_is_not_stored():
+    book_cache = cache.Cache("test", cache.MemoryBackend(10, 60))
+
+    def stale_loader():
+        # The row changes and is invalidated while the old version is loaded
+        book_cache.delete(1)
+        return "old"
+
+    assert book_cache.get_or_set(1, stale_loader) == "old"
+    assert book_cache.get_or_set(1, lambda: "new") == "new"
+
+
+def test_redis_outage_does_not_fail_invalidation(monkeypatch):
+    redis_error = type("RedisError", (Exception,), {})
+    monkeypatch.setattr(cache, "redis", SimpleNamespace(RedisError=redis_error))
+
+    class FailingClient:
+        def delete(self, *keys):
+            raise redis_error("down")
+
+        def scan_iter(self, **kwargs):
+            raise redis_error("down")
+
+    backend = cache.RedisBackend.__new__(cache.RedisBackend)
+    backend.prefix = "test:"
+    backend._client = FailingClient()
+
+    backend.delete(1)
+    backend.clear()
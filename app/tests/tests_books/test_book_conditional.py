@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock, patch
+
+from app import cache, schemas, services
+from app import db as app_db
+from .test_conf import app, client, mock_books
+
+book = schemas.BookModel(**mock_books[0])
+etag, last_modified = services.get_book_freshness(book)
+
+
+def test_get_book_sends_validators():
+    with patch("app.services.get_book_by_id", return_value=book):
+        response = client.get("/books/1")
+
+        assert response.status_code == 200
+        assert response.headers["etag"] == etag
+        assert response.headers["last-modified"] == "Sat, 10 May 2025 15:45:00 GMT"
+
+
+def test_get_book_if_none_match_not_modified():
+    with patch("app.services.get_book_by_id", return_value=book):
+        response = client.get("/books/1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+
+def test_get_book_if_modified_since_not_modified():
+    with patch("app.services.get_book_by_id", return_value=book):
+        response = client.get(
+            "/books/1", headers={"If-Modified-Since": "Sat, 10 May 2025 15:45:00 GMT"}
+        )
+
+        assert response.status_code == 304
+
+
+def test_get_book_changed_etag_returns_body():
+    with patch("app.services.get_book_by_id", return_value=book):
+        response = client.get("/books/1", headers={"If-None-Match": 'W/"stale"'})
+
+        assert response.status_code == 200
+        assert response.json()["book_id"] == 1
+
+
+def test_get_book_etag_follows_updates():
+    updated = book.model_copy(update={"updated_at": book.updated_at.replace(hour=16)})
+
+    assert services.get_book_freshness(updated)[0] != etag
+
+
+def test_get_books_if_none_match_not_modified():
+    books = [schemas.BookModel(**mock_book) for mock_book in mock_books]
+    pagination = schemas.Pagination()
+    sorting = schemas.SortingBooks(sort_by="book_name", order="asc", genres=None)
+    books_etag, _ = services.get_books_freshness(books, pagination, sorting)
+    with patch("app.services.get_books", return_value=books):
+        response = client.get("/books", headers={"If-None-Match": books_etag})
+
+        assert response.status_code == 304
+
+
+def test_cached_book_revalidates_without_query(monkeypatch):
+    detail_cache = cache.Cache("test", cache.MemoryBackend(10, 60))
+    detail_cache.backend.set(1, book)
+    monkeypatch.setattr(services.book_service, "book_detail_cache", detail_cache)
+    session = MagicMock()
+    app.dependency_overrides[app_db.get_db] = lambda: session
+    try:
+        response = client.get("/books/1", headers={"If-None-Match": etag})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 304
+    assert not session.method_calls
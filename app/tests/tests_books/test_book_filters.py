@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import db as app_db
+from app import schemas, services
+from .test_conf import add_book, client, db_session
+
+
+def test_get_books_genres_match_defaults_to_any():
+    with patch("app.services.get_books", return_value=[]) as mock_get:
+        response = client.get("/books?genres=Fiction&genres=Mystery")
+
+        assert response.status_code == 200
+        sorting = mock_get.call_args.args[1]
+        assert [genre.genre_name for genre in sorting.genres] == [
+            "Fiction",
+            "Mystery",
+        ]
+        assert sorting.genres_match == "any"
+
+
+def test_get_books_genres_match_all():
+    with patch("app.services.get_books", return_value=[]) as mock_get:
+        response = client.get("/books?genres=Fiction&genres_match=all")
+
+        assert response.status_code == 200
+        assert mock_get.call_args.args[1].genres_match == "all"
+
+
+def test_get_books_genres_match_invalid():
+    response = client.get("/books?genres=Fiction&genres_match=some")
+
+    assert response.status_code == 422
+
+
+def test_get_book_facets():
+    facets = {
+        "total": 2,
+        "genres": [{"value": "Mystery", "count": 1}],
+        "authors": [{"value": "John Doe", "count": 1}],
+        "price_histogram": [{"min_price": 10.0, "max_price": 20.0, "count": 2}],
+    }
+    with patch("app.services.get_book_facets", return_value=facets) as mock_facets:
+        response = client.get("/books/facets?genres=Mystery")
+
+        assert response.status_code == 200
+        assert response.json() == facets
+        sorting = mock_facets.call_args.args[0]
+        assert [genre.genre_name for genre in sorting.genres] == ["Mystery"]
+
+
+@pytest.mark.parametrize(
+    ("genres_match", "expected"),
+    [("any", ["Fen And Moor", "Fen Only", "Moor Only"]), ("all", ["Fen And Moor"])],
+)
+def test_get_books_genres_match_on_test_database(db_session, genres_match, expected):
+    fens = app_db.models.Genre(genre_name="Fenland")
+    moors = app_db.models.Genre(genre_name="Moorland")
+    add_book(db_session, "Fen Only", genres=[fens])
+    add_book(db_session, "Moor Only", genres=[moors])
+    add_book(db_session, "Fen And Moor", genres=[fens, moors])
+    add_book(db_session, "Neither", genres=[])
+    db_session.commit()
+    services.invalidate_book_cache()
+
+    response = client.get(
+        "/books",
+        params={
+            "genres": ["Fenland", "Moorland"],
+            "genres_match": genres_match,
+            "limit": 10,
+        },
+    )
+
+    assert response.status_code == 200
+    # Each book appears once, however many of the genres it has
+    assert [book["book_name"] for book in response.json()] == expected
+
+
+def facet_counts(facets: schemas.BookFacets):
+    return (
+        facets.total,
+        {genre.value: genre.count for genre in facets.genres},
+        {author.value: author.count for author in facets.authors},
+        {bucket.min_price: bucket.count for bucket in facets.price_histogram},
+    )
+
+
+def test_book_facets_on_test_database(db_session):
+    def facets(*genres, genres_match="any"):
+        sorting = schemas.SortingBooks(
+            sort_by="book_name",
+            order="asc",
+            genres=list(genres) or None,
+            genres_match=genres_match,
+        )
+        return facet_counts(services.get_book_facets(sorting, db_session))
+
+    total_before, genres_before, authors_before, prices_before = facets()
+    fens = app_db.models.Genre(genre_name="Fenland")
+    moors = app_db.models.Genre(genre_name="Moorland")
+    add_book(db_session, "Fen One", author="Ann Reed", price=5, genres=[fens])
+    add_book(db_session, "Fen Two", author="Ann Reed", price=12, genres=[fens, moors])
+    add_book(db_session, "Fen Three", author="Bo Marsh", price=19.5, genres=[fens])
+    add_book(db_session, "Moor One", author="Cy Heath", price=31, genres=[moors])
+    db_session.commit()
+    services.invalidate_book_cache()
+
+    total, genres, authors, prices = facets()
+    assert total == total_before + 4
+    assert {name: genres[name] for name in ("Fenland", "Moorland")} == {
+        "Fenland": 3,
+        "Moorland": 2,
+    }
+    assert genres.keys() - {"Fenland", "Moorland"} == genres_before.keys()
+    for author, added in {"Ann Reed": 2, "Bo Marsh": 1, "Cy Heath": 1}.items():
+        assert authors[author] == authors_before.get(author, 0) + added
+    for low, added in {0: 1, 10: 2, 30: 1}.items():
+        assert prices[low] == prices_before.get(low, 0) + added
+
+    # Every facet is counted over the filtered books only
+    assert facets("Fenland") == (
+        3,
+        {"Fenland": 3, "Moorland": 1},
+        {"Ann Reed": 2, "Bo Marsh": 1},
+        {0: 1, 10: 2},
+    )
+    assert facets("Fenland", "Moorland", genres_match="all") == (
+        1,
+        {"Fenland": 1, "Moorland": 1},
+        {"Ann Reed": 1},
+        {10: 1},
+    )
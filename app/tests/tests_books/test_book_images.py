@@ -0,0 +1,603 @@
+import asyncio
+import base64
+import io
+import os
+import zipfile
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import UploadFile
+from PIL import ExifTags, Image
+from starlette.datastructures import Headers
+
+from starlette.concurrency import run_in_threadpool
+
+from app import config, schemas, services, storage
+from app import db as app_db
+from app.services import image_job_service, image_service
+from app.exceptions import errors
+from .test_conf import (
+    add_book,
+    client,
+    app,
+    db_session,
+    override_get_current_active_user_admin,
+)
+
+
+@pytest.fixture
+def source_image(tmp_path):
+    path = str(tmp_path / "cover.png")
+    Image.new("RGBA", (800, 1200), "red").save(path)
+    return path
+
+
+@pytest.fixture
+def fresh_image_pool(monkeypatch):
+    # Pool workers keep the config they were started with, start new ones
+    monkeypatch.setattr(image_service, "_image_pool", None)
+    yield
+    if image_service._image_pool is not None:
+        image_service._image_pool.shutdown()
+
+
+IMAGE_HEADERS = Headers({"content-type": "image/png"})
+
+
+def png_bytes(size=(40, 60), mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_nearest_variant_width_rounds_up():
+    assert services.nearest_variant_width(100) == 120
+    assert services.nearest_variant_width(121) == 240
+    assert services.nearest_variant_width(5000) == 960
+
+
+def test_negotiate_variant_format_prefers_query_then_accept():
+    assert services.negotiate_variant_format("jpeg", "image/webp") == "jpeg"
+    assert services.negotiate_variant_format(None, "image/webp,*/*") == "webp"
+    assert services.negotiate_variant_format(None, None) == "jpeg"
+
+
+def test_variant_generated_on_demand(source_image):
+    path = asyncio.run(services.get_image_variant(source_image, 240, "jpeg"))
+
+    assert path.endswith(os.path.join("variants", "cover_240.jpg"))
+    with Image.open(path) as variant:
+        assert variant.size == (240, 360)
+        assert variant.mode == "RGB"
+
+
+def test_cold_variant_rejected_when_image_pool_full(source_image, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_WORKERS", 0)
+    monkeypatch.setattr(config, "IMAGE_QUEUE_LIMIT", 0)
+
+    with pytest.raises(errors.ImageProcessingBusy):
+        asyncio.run(services.get_image_variant(source_image, 480, "jpeg"))
+
+
+def test_variants_deleted_with_image(tmp_path, source_image):
+    asyncio.run(services.get_image_variant(source_image, 120, "jpeg"))
+
+    asyncio.run(services.delete_image(source_image))
+
+    assert not os.path.exists(source_image)
+    assert os.listdir(tmp_path / "variants") == []
+
+
+def test_identical_uploads_share_one_blob(tmp_path, monkeypatch, fresh_image_pool):
+    monkeypatch.setattr(config, "IMAGES_BLOBS_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(config, "IMAGE_VARIANT_WIDTHS", [120])
+    contents = png_bytes()
+    stored = []
+
+    for _ in range(2):
+        upload = services.stage_upload(io.BytesIO(contents))
+        stored.append(asyncio.run(services.store_image(upload)))
+        services.discard_upload(upload)
+
+    assert stored[0] == stored[1]
+    assert stored[0].path == services.blob_path(stored[0].sha256, "png")
+    # Nothing to normalize and a re-encode would not be smaller: kept as uploaded
+    with open(stored[0].path, "rb") as blob:
+        assert blob.read() == contents
+
+
+def test_cover_sizes_recorded_on_the_book(
+    db_session, tmp_path, monkeypatch, fresh_image_pool
+):
+    monkeypatch.setattr(config, "IMAGES_BLOBS_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(config, "IMAGE_VARIANT_WIDTHS", [])
+    book = add_book(db_session, "Covered Book")
+    db_session.commit()
+    contents = png_bytes()
+    upload = services.stage_upload(io.BytesIO(contents))
+
+    try:
+        result = asyncio.run(
+            services.update_cover_for_book(upload, book.book_id, db_session)
+        )
+    finally:
+        services.discard_upload(upload)
+
+    db_session.refresh(book)
+    assert (
+        book.book_cover_bytes == result["bytes"] == os.path.getsize(result["new_cover"])
+    )
+    assert book.book_cover_original_bytes == len(contents)
+
+    asyncio.run(services.delete_cover_for_book(book.book_id, db_session))
+    db_session.refresh(book)
+    assert book.book_cover_bytes is None
+    assert book.book_cover_original_bytes is None
+
+
+def test_normalize_orients_strips_and_caps(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_MAX_DIMENSION", 100)
+    source = str(tmp_path / "phone.jpg")
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = 6  # rotated 90 degrees clockwise
+    exif[ExifTags.Base.Model] = "Phone"
+    Image.new("RGB", (400, 200), "green").save(source, exif=exif)
+    target = str(tmp_path / "normalized")
+
+    assert services.normalize_image(source, target) == "jpeg"
+
+    with Image.open(target) as normalized:
+        assert normalized.size == (50, 100)
+        assert "exif" not in normalized.info
+
+
+def test_normalize_keeps_transparency(tmp_path):
+    source = str(tmp_path / "logo.png")
+    Image.new("RGBA", (3000, 10), (255, 0, 0, 128)).save(source)
+    target = str(tmp_path / "normalized")
+
+    assert services.normalize_image(source, target) == "png"
+
+    with Image.open(target) as normalized:
+        assert normalized.mode == "RGBA"
+        assert max(normalized.size) == config.IMAGE_MAX_DIMENSION
+
+
+def test_local_storage_round_trip(tmp_path):
+    store = storage.LocalStorage(str(tmp_path), 1)
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"0123456789")
+
+    async def round_trip():
+        await store.put_file("a/b_1.bin", str(source))
+        assert await store.get("a/b_1.bin") == b"0123456789"
+        assert await store.size("a/b_1.bin") == 10
+        assert await store.list_keys("a/b_") == ["a/b_1.bin"]
+        chunks = [chunk async for chunk in store.stream("a/b_1.bin", 4)]
+        assert chunks == [b"0123", b"4567", b"89"]
+        await store.delete("a/b_1.bin")
+        assert await store.size("a/b_1.bin") is None
+
+    asyncio.run(round_trip())
+
+
+def test_legacy_covers_read_outside_the_blob_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        image_service, "image_storage", storage.LocalStorage(str(tmp_path), 1)
+    )
+    default_cover = os.path.join(config.IMAGES_BOOKS_PATH, "cover_not_available.jpg")
+    blob = os.path.join(config.IMAGES_BLOBS_PATH, "ab", "abcd.webp")
+
+    legacy_store = image_service.storage_for(default_cover)
+    assert legacy_store is not image_service.image_storage
+    assert os.path.isfile(legacy_store.local_path(default_cover))
+    assert image_service.storage_for(blob) is image_service.image_storage
+
+
+class FakeClientError(Exception):
+    def __init__(self, code):
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Body:
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+    def close(self):
+        pass
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, source_path, bucket, key, ExtraArgs=None):
+        with open(source_path, "rb") as file:
+            self.objects[(bucket, key)] = (file.read(), ExtraArgs)
+
+    def _object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeClientError("NoSuchKey")
+        return self.objects[(Bucket, Key)][0]
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeS3Body(self._object(Bucket, Key))}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeClientError("404")
+        return {"ContentLength": len(self._object(Bucket, Key))}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_s3_storage_round_trip(tmp_path, monkeypatch):
+    client = FakeS3Client()
+    monkeypatch.setattr(
+        storage, "boto3", SimpleNamespace(client=lambda *args, **kwargs: client)
+    )
+    monkeypatch.setattr(storage, "ClientError", FakeClientError, raising=False)
+    store = storage.S3Storage("covers", None, None, "shop/", 1)
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"0123456789")
+
+    async def round_trip():
+        await store.put_file("a/b_1.bin", str(source), "image/webp")
+        assert client.objects[("covers", "shop/a/b_1.bin")] == (
+            b"0123456789",
+            {"ContentType": "image/webp"},
+        )
+        assert await store.get("a/b_1.bin") == b"0123456789"
+        assert await store.size("a/b_1.bin") == 10
+        chunks = [chunk async for chunk in store.stream("a/b_1.bin", 4)]
+        assert chunks == [b"0123", b"4567", b"89"]
+        await store.delete("a/b_1.bin")
+        # A missing key looks the same as on the local disk
+        assert await store.size("a/b_1.bin") is None
+        with pytest.raises(FileNotFoundError):
+            await store.get("a/b_1.bin")
+
+    asyncio.run(round_trip())
+
+
+def test_placeholder_is_a_tiny_data_uri(source_image):
+    placeholder = services.render_placeholder(source_image)
+
+    header, encoded = placeholder.split(",", 1)
+    assert header == "data:image/webp;base64"
+    assert len(placeholder) < 1000
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as image:
+        assert image.size == (config.IMAGE_PLACEHOLDER_WIDTH, 24)
+
+
+def test_image_task_rejected_when_queue_full(monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_WORKERS", 0)
+    monkeypatch.setattr(config, "IMAGE_QUEUE_LIMIT", 0)
+
+    with pytest.raises(errors.ImageProcessingBusy):
+        asyncio.run(services.run_image_task(print))
+
+
+def test_cover_upload_busy_returns_retry_after():
+    busy = AsyncMock(side_effect=errors.ImageProcessingBusy())
+    with patch("app.services.update_cover_for_book", busy):
+        app.dependency_overrides[services.get_current_active_user] = (
+            override_get_current_active_user_admin
+        )
+
+        response = client.put(
+            "/admin/books/1/cover", files={"file": ("c.png", png_bytes(), "image/png")}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(config.IMAGE_RETRY_AFTER_SECONDS)
+        # The endpoint removes the staged file whatever the outcome
+        upload = busy.call_args.args[0]
+        assert not os.path.exists(upload.path)
+        app.dependency_overrides.clear()
+
+
+def test_stage_upload_probes():
+    contents = png_bytes()
+
+    upload = services.stage_upload(io.BytesIO(contents))
+
+    assert (upload.width, upload.height, upload.image_format) == (40, 60, "PNG")
+    assert upload.size == len(contents)
+    services.discard_upload(upload)
+    assert not os.path.exists(upload.path)
+
+
+def test_stage_upload_rejects_oversized_file(monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_UPLOAD_MAX_BYTES", 10)
+
+    with pytest.raises(errors.ImageTooLarge):
+        services.stage_upload(io.BytesIO(png_bytes()))
+
+
+def test_stage_upload_rejects_too_many_pixels(monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_MAX_PIXELS", 1000)
+
+    with pytest.raises(errors.ImageTooLarge):
+        services.stage_upload(io.BytesIO(png_bytes((100, 100), "1")))
+
+
+def test_stage_upload_rejects_non_images():
+    with pytest.raises(errors.FileMustBeImage):
+        services.stage_upload(io.BytesIO(b"not an image"))
+
+
+def test_cover_url_uses_blob_hash():
+    blob = services.blob_path("ab" * 32, "png")
+
+    assert schemas.cover_url(3, blob) == f"/books/3/cover?v={'ab' * 8}"
+    assert schemas.cover_version(config.DEFAULT_COVER_PATH) != "ab" * 8
+
+
+def test_versioned_cover_is_immutable_and_revalidates(source_image):
+    cover = services.CoverFile(
+        path=source_image,
+        media_type="image/png",
+        version="abc",
+        stat=os.stat(source_image),
+    )
+    with patch("app.services.get_cover_file", AsyncMock(return_value=cover)):
+        response = client.get("/books/1/cover?v=abc")
+
+        assert response.status_code == 200
+        assert response.headers["etag"] == '"abc"'
+        assert "immutable" in response.headers["cache-control"]
+
+        response = client.get("/books/1/cover", headers={"if-none-match": '"abc"'})
+
+        assert response.status_code == 304
+        assert response.headers["cache-control"] == "no-cache"
+
+        response = client.get("/books/1/cover", headers={"range": "bytes=0-9"})
+
+        assert response.status_code == 206
+        assert len(response.content) == 10
+
+
+def test_parse_book_ids_dedupes_and_limits(monkeypatch):
+    monkeypatch.setattr(config, "COVER_BATCH_MAX_IDS", 3)
+
+    assert services.parse_book_ids("3,1,3") == [3, 1]
+    with pytest.raises(errors.InvalidBookIds):
+        services.parse_book_ids("1,2,3,4")
+    with pytest.raises(errors.InvalidBookIds):
+        services.parse_book_ids("1,two")
+
+
+def test_cover_batch_rejects_bad_ids():
+    response = client.get("/books/covers?ids=1,,2")
+
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "invalid_book_ids"
+
+
+def test_cover_bundle_zips_thumbnails(source_image):
+    paths = {1: source_image, 2: source_image + ".missing"}
+    with patch("app.services.book_service._get_cover_paths", return_value=paths):
+        contents = asyncio.run(services.get_cover_bundle([1, 2, 3], 120, "jpeg", None))
+
+    with zipfile.ZipFile(io.BytesIO(contents)) as bundle:
+        assert bundle.namelist() == ["1.jpg"]
+        with Image.open(bundle.open("1.jpg")) as thumbnail:
+            assert thumbnail.width == 120
+
+
+def test_background_upload_returns_job_id():
+    job = schemas.ImageJobModel(
+        job_id=7, book_id=1, status="queued", created_at=datetime.now(), items=[]
+    )
+    with patch("app.services.enqueue_image_job", return_value=job) as enqueue:
+        app.dependency_overrides[services.get_current_active_user] = (
+            override_get_current_active_user_admin
+        )
+
+        response = client.post(
+            "/admin/books/1/images?background=true",
+            files={"file": ("g.png", png_bytes(), "image/png")},
+        )
+
+        assert response.status_code == 202
+        assert response.json()["job_id"] == 7
+        _, [(filename, upload)], _ = enqueue.call_args.args
+        assert filename == "g.png"
+        services.discard_upload(upload)
+        app.dependency_overrides.clear()
+
+
+def test_image_job_reports_per_file_outcome():
+    job = schemas.ImageJobModel(
+        job_id=7,
+        book_id=1,
+        status="running",
+        created_at=datetime.now(),
+        items=[
+            schemas.ImageJobItemModel(item_id=1, status="done", image_id=3),
+            schemas.ImageJobItemModel(
+                item_id=2, status="failed", error="file_must_be_image"
+            ),
+            schemas.ImageJobItemModel(item_id=3, status="queued"),
+        ],
+    )
+    with patch("app.services.get_image_job", return_value=job):
+        app.dependency_overrides[services.get_current_active_user] = (
+            override_get_current_active_user_admin
+        )
+
+        response = client.get("/admin/jobs/7")
+
+        assert response.status_code == 200
+        assert response.json()["processed"] == 2
+        assert response.json()["failed"] == 1
+        assert response.json()["items"][1]["error"] == "file_must_be_image"
+        app.dependency_overrides.clear()
+
+
+def test_stage_uploads_reports_each_file():
+    files = [
+        UploadFile(io.BytesIO(png_bytes()), filename="ok.png", headers=IMAGE_HEADERS),
+        UploadFile(io.BytesIO(b"junk"), filename="bad.png", headers=IMAGE_HEADERS),
+        UploadFile(io.BytesIO(b"text"), filename="notes.txt"),
+    ]
+
+    ok, bad, text = asyncio.run(services.stage_uploads(files))
+
+    assert isinstance(ok, services.StagedUpload)
+    assert isinstance(bad, errors.FileMustBeImage)
+    assert isinstance(text, errors.FileMustBeImage)
+    services.discard_upload(ok)
+
+
+def test_batch_staging_failure_discards_staged_files(tmp_path):
+    staged = tmp_path / "staged.upload"
+    staged.write_bytes(b"image")
+    ok = services.StagedUpload(str(staged), 5, 4, 4, "png")
+    files = [
+        UploadFile(io.BytesIO(b""), filename=f"{i}.png", headers=IMAGE_HEADERS)
+        for i in range(3)
+    ]
+
+    with patch(
+        "app.services.image_service.stage_upload",
+        side_effect=[ok, OSError("disk full"), errors.ImageTooLarge()],
+    ):
+        with pytest.raises(OSError):
+            asyncio.run(services.stage_uploads(files))
+
+    assert not staged.exists()
+
+
+def test_batch_storage_failure_releases_stored_blobs(tmp_path):
+    uploads = [
+        services.StagedUpload(str(tmp_path / f"{i}.upload"), 10, 4, 4, "png")
+        for i in range(3)
+    ]
+    stored = services.StoredImage(
+        "blobs/ab/ab.webp", "webp", "data:", "ab" * 32, 4, 4, 8
+    )
+    store_image = AsyncMock(
+        side_effect=[stored, OSError("disk full"), errors.FileMustBeImage()]
+    )
+
+    with (
+        patch("app.services.image_service.store_image", store_image),
+        patch("app.services.book_service._release_image_file") as release,
+    ):
+        with pytest.raises(OSError):
+            asyncio.run(
+                services.add_images_for_book(
+                    uploads, ["a.png", "b.png", "c.png"], 1, MagicMock()
+                )
+            )
+
+    release.assert_awaited_once()
+    assert release.await_args.args[0] == stored.path
+
+
+@pytest.mark.parametrize(
+    "error", [errors.InvalidBookIds, errors.ImageTooLarge, errors.TooManyImages]
+)
+def test_image_errors_have_docstrings(error):
+    assert error.__doc__
+    assert error().detail["message"]
+
+
+def test_batch_upload_rejects_too_many_files(monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_BATCH_MAX_FILES", 1)
+    app.dependency_overrides[services.get_current_active_user] = (
+        override_get_current_active_user_admin
+    )
+
+    response = client.post(
+        "/admin/books/1/images/batch",
+        files=[("files", (f"{i}.png", png_bytes(), "image/png")) for i in range(2)],
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "error_code": "too_many_images",
+        # Built when raised, so it follows the current config
+        "message": "At most 1 images can be uploaded at once.",
+    }
+    app.dependency_overrides.clear()
+
+
+def test_oversized_upload_rejected_before_spooling(monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_UPLOAD_MAX_BYTES", 1024)
+    stage = patch("app.services.stage_upload")
+    app.dependency_overrides[services.get_current_active_user] = (
+        override_get_current_active_user_admin
+    )
+
+    with stage as stage_upload:
+        body = b"x" * (200 * 1024)
+        response = client.put(
+            "/admin/books/1/cover",
+            content=body,
+            headers={"content-type": "multipart/form-data; boundary=b"},
+        )
+        assert response.status_code == 413
+
+        # Without a Content-Length the streamed bytes are counted
+        chunked = client.put(
+            "/admin/books/1/cover",
+            content=(body[i : i + 4096] for i in range(0, len(body), 4096)),
+            headers={"content-type": "multipart/form-data; boundary=b"},
+        )
+        assert chunked.status_code == 413
+        assert chunked.json()["error_code"] == "image_too_large"
+
+    stage_upload.assert_not_called()
+    app.dependency_overrides.clear()
+
+
+def test_slow_image_job_keeps_its_lease(db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "IMAGE_JOB_LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(config, "IMAGE_JOB_HEARTBEAT_SECONDS", 0.05)
+    book = add_book(db_session, "Slow Uploads")
+    db_session.flush()
+    job = app_db.models.ImageJob(book_id=book.book_id, status="queued")
+    job.items.append(
+        app_db.models.ImageJobItem(
+            filename="a.png",
+            upload_path=str(tmp_path / "a.upload"),
+            image_format="png",
+            width=40,
+            height=60,
+            bytes=100,
+            status="queued",
+        )
+    )
+    db_session.add(job)
+    db_session.commit()
+    claims = []
+
+    async def slow_store(upload):
+        # Waits longer than the lease, like a file behind a saturated pool
+        await asyncio.sleep(1)
+        claims.append(await run_in_threadpool(image_job_service._claim_image_job))
+        raise OSError("storage down")
+
+    monkeypatch.setattr(image_job_service, "_store_when_idle", slow_store)
+    try:
+        assert image_job_service._claim_image_job() == job.job_id
+        asyncio.run(image_job_service._run_image_job(job.job_id))
+
+        # Another worker polling meanwhile did not take the job over
+        assert job.job_id not in claims
+        db_session.refresh(job)
+        assert job.status == "done"
+        assert [item.status for item in job.items] == ["failed"]
+    finally:
+        db_session.delete(job)
+        db_session.commit()
@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+
+from app import db as app_db
+from app import services, schemas
+from app.exceptions import errors
+from .test_conf import add_book, client, db_session, mock_books
+
+
+@pytest.fixture
+def books():
+    return [SimpleNamespace(**book) for book in mock_books]
+
+
+@pytest.fixture
+def sorting():
+    return schemas.SortingBooks(sort_by="book_price", order="desc", genres=None)
+
+
+def test_book_cursor_roundtrip(sorting):
+    book = SimpleNamespace(book_id=7, book_price=19.99)
+
+    cursor = services.encode_book_cursor(book, sorting)
+
+    assert services.decode_book_cursor(cursor, sorting) == (19.99, 7)
+
+
+def test_book_cursor_other_sorting_rejected(sorting):
+    book = SimpleNamespace(book_id=7, book_price=19.99)
+    cursor = services.encode_book_cursor(book, sorting)
+    other = schemas.SortingBooks(sort_by="book_price", order="asc", genres=None)
+
+    with pytest.raises(errors.InvalidCursor):
+        services.decode_book_cursor(cursor, other)
+
+
+def test_book_cursor_malformed_rejected(sorting):
+    with pytest.raises(errors.InvalidCursor):
+        services.decode_book_cursor("not-a-cursor", sorting)
+
+
+def make_cursor(**payload):
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    ("sort_by", "value", "book_id"),
+    [
+        ("book_price", {"a": 1}, 7),
+        ("book_price", [1, 2], 7),
+        ("book_price", "19.99", 7),
+        ("book_price", True, 7),
+        ("book_price", None, 7),
+        ("book_name", 19.99, 7),
+        ("book_name", ["Dune"], 7),
+        ("book_price", 19.99, "7"),
+        ("book_price", 19.99, 7.5),
+        ("book_price", 19.99, None),
+    ],
+)
+def test_book_cursor_value_of_wrong_type_rejected(sort_by, value, book_id):
+    sorting = schemas.SortingBooks(sort_by=sort_by, order="asc", genres=None)
+    cursor = make_cursor(sort_by=sort_by, order="asc", value=value, book_id=book_id)
+
+    with pytest.raises(errors.InvalidCursor):
+        services.decode_book_cursor(cursor, sorting)
+
+
+def test_book_cursor_wrong_type_is_a_client_error():
+    cursor = make_cursor(sort_by="book_name", order="asc", value={"a": 1}, book_id=1)
+
+    response = client.get("/books", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "invalid_cursor"
+
+
+def test_book_cursor_datetime_roundtrip():
+    sorting = SimpleNamespace(sort_by="created_at", order="asc")
+    book = SimpleNamespace(book_id=7, created_at=datetime(2025, 5, 1, 10, 30))
+
+    cursor = services.encode_book_cursor(book, sorting)
+
+    assert services.decode_book_cursor(cursor, sorting) == (book.created_at, 7)
+
+
+def test_get_books_full_page_returns_next_cursor(books):
+    with patch("app.services.get_books", return_value=books):
+        response = client.get("/books?limit=2")
+
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert "x-next-cursor" in response.headers
+
+
+def test_get_books_last_page_has_no_cursor(books):
+    with patch("app.services.get_books", return_value=books):
+        response = client.get("/books?limit=10")
+
+        assert response.status_code == 200
+        assert "x-next-cursor" not in response.headers
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_walk_across_equal_sort_keys(db_session, order):
+    fens = app_db.models.Genre(genre_name="Fenland")
+    books = [
+        add_book(db_session, f"Fen Book {n}", price=price, genres=[fens])
+        for n, price in enumerate([12, 9, 9, 9, 9, 15])
+    ]
+    db_session.commit()
+    services.invalidate_book_cache()
+
+    walked, pages, cursor = [], 0, None
+    while True:
+        params = {"genres": "Fenland", "sort_by": "book_price", "order": order}
+        params.update({"limit": 2, "cursor": cursor} if cursor else {"limit": 2})
+        response = client.get("/books", params=params)
+        assert response.status_code == 200
+        walked += [book["book_id"] for book in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    # Ties on the price are broken by book_id: nothing skipped, nothing repeated
+    expected = sorted(books, key=lambda book: (book.book_price, book.book_id))
+    if order == "desc":
+        expected.reverse()
+    assert walked == [book.book_id for book in expected]
+    assert pages == 4
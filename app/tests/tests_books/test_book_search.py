@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from app import schemas, services
+from .test_conf import add_book, client, db_session, mock_books
+
+
+def test_search_books_success():
+    with patch("app.services.search_books", return_value=mock_books) as mock_search:
+        response = client.get("/books/search?q=mystery&limit=5")
+
+        assert response.status_code == 200
+        assert [book["book_id"] for book in response.json()] == [1, 2]
+        query, pagination, _ = mock_search.call_args.args
+        assert query == "mystery"
+        assert pagination.limit == 5
+
+
+def test_search_books_requires_query():
+    response = client.get("/books/search")
+
+    assert response.status_code == 422
+
+
+def test_search_books_empty_query():
+    response = client.get("/books/search?q=")
+
+    assert response.status_code == 422
+
+
+def test_search_books_ranks_on_test_database(db_session):
+    add_book(db_session, "Marsh Walks", "Bo Ray", "Reeds, sedges and quillwort.")
+    add_book(db_session, "Quillwort Notes", "Ann Lee", "Field notes.")
+    add_book(db_session, "Field Guide", "Ann Quillwort", "Plants of the fens.")
+    db_session.commit()
+
+    # Full-text search on PostgreSQL, the LIKE fallback elsewhere
+    books = services.search_books("quillwort", schemas.Pagination(), db_session)
+
+    # Matches in the name rank above the author, the description comes last
+    assert [book.book_name for book in books] == [
+        "Quillwort Notes",
+        "Field Guide",
+        "Marsh Walks",
+    ]
+    page = services.search_books(
+        "quillwort", schemas.Pagination(skip=1, limit=1), db_session
+    )
+    assert [book.book_name for book in page] == ["Field Guide"]
+
+
+def test_search_books_wildcards_are_literal(db_session):
+    add_book(db_session, "Quillwort Notes", "Ann Lee", "Field notes.")
+    db_session.commit()
+
+    assert services.search_books("%", schemas.Pagination(), db_session) == []
+
+
+def test_search_books_rejects_cursor():
+    response = client.get("/books/search?q=mystery&cursor=abc")
+
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "invalid_cursor"
@@ -0,0 +1,45 @@
+import pytest
+
+from app import services
+from .test_conf import client
+
+
+@pytest.fixture
+def index():
+    index = services.SuggestionIndex()
+    index.add(1, "Crooked House", "Agatha Christie")
+    index.add(2, "Crème Brûlée", "Agatha Christie")
+    return index
+
+
+def test_suggest_matches_word_prefix(index):
+    suggestions = index.suggest("hou", limit=10)
+
+    assert [(s.text, s.book_id) for s in suggestions] == [("Crooked House", 1)]
+
+
+def test_suggest_ignores_accents_and_case(index):
+    suggestions = index.suggest("  CREME", limit=10)
+
+    assert [s.text for s in suggestions] == ["Crème Brûlée"]
+
+
+def test_suggest_deduplicates_authors(index):
+    suggestions = index.suggest("agatha", limit=10)
+
+    assert [(s.text, s.kind) for s in suggestions] == [("Agatha Christie", "author")]
+
+
+def test_suggest_reflects_updates_and_removals(index):
+    index.add(1, "Curtain", "Agatha Christie")
+    assert index.suggest("crooked", limit=10) == []
+    assert [s.book_id for s in index.suggest("curt", limit=10)] == [1]
+
+    index.remove(1)
+    assert index.suggest("curt", limit=10) == []
+
+
+def test_suggest_endpoint_limit_capped():
+    response = client.get("/books/suggest?prefix=a&limit=1000")
+
+    assert response.status_code == 422
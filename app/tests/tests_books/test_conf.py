@@ -1,4 +1,6 @@
-from app import schemas
+import pytest
+from app import schemas, services
+from app import db as app_db
 from datetime import datetime
 from fastapi.testclient import TestClient
 from app.main import app
@@ -59,3 +61,53 @@ def override_get_current_active_user_user():
         created_at=datetime.now(),
         updated_at=datetime.now(),
     )
+
+
+@pytest.fixture
+def db_session():
+    """Session on the test database; rows added with it are deleted afterwards."""
+    Book, Genre = app_db.models.Book, app_db.models.Genre
+    session = app_db.LocalSession()
+    existing_books = {book_id for (book_id,) in session.query(Book.book_id)}
+    existing_genres = {genre_id for (genre_id,) in session.query(Genre.genre_id)}
+    yield session
+    session.rollback()
+    for book in session.query(Book).filter(Book.book_id.not_in(existing_books)):
+        session.delete(book)
+    session.flush()
+    for genre in session.query(Genre).filter(Genre.genre_id.not_in(existing_genres)):
+        session.delete(genre)
+    session.commit()
+    session.close()
+    services.invalidate_book_cache()
+
+
+def add_book(session, name, author="Ann Lee", description="", price=10, genres=()):
+    book = app_db.models.Book(
+        book_name=name,
+        book_author=author,
+        book_description=description,
+        book_price=price,
+        book_cover_path="app/static/images/books/cover_not_available.jpg",
+        genres=list(genres),
+    )
+    session.add(book)
+    return book
+
+
+@pytest.fixture
+def as_admin():
+    app.dependency_overrides[services.get_current_active_user] = (
+        override_get_current_active_user_admin
+    )
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def as_user():
+    app.dependency_overrides[services.get_current_active_user] = (
+        override_get_current_active_user_user
+    )
+    yield
+    app.dependency_overrides.clear()
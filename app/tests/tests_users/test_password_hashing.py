@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from app import config, services
+from app.exceptions import errors
+from .test_conf import client
+
+
+def test_hash_and_check_run_in_the_pool():
+    hashed = asyncio.run(services.hash_password("1!SecurePass"))
+
+    assert asyncio.run(services.check_password("1!SecurePass", hashed))
+    assert not asyncio.run(services.check_password("wrong", hashed))
+
+
+def test_hashing_rejected_when_queue_full(monkeypatch):
+    monkeypatch.setattr(config, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(config, "PASSWORD_HASH_QUEUE_LIMIT", 0)
+
+    with pytest.raises(errors.PasswordHashingBusy):
+        asyncio.run(services.hash_password("1!SecurePass"))
+
+
+def test_hashing_dropped_after_queue_timeout(monkeypatch):
+    monkeypatch.setattr(config, "PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", -1)
+
+    with pytest.raises(errors.PasswordHashingBusy):
+        asyncio.run(services.hash_password("1!SecurePass"))
+
+
+def test_login_busy_returns_retry_after():
+    busy = AsyncMock(side_effect=errors.PasswordHashingBusy())
+    with patch("app.services.authenticate_user", busy):
+        response = client.post("/token", data={"username": "u", "password": "p"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(
+        config.PASSWORD_HASH_RETRY_AFTER_SECONDS
+    )
+
+
+def test_login_rehashes_outdated_hash():
+    outdated = bcrypt.using(rounds=4).hash("1!SecurePass")
+    user = SimpleNamespace(hashed_password=outdated)
+    session = MagicMock()
+    with patch("app.services.user_service.get_user", return_value=user):
+        authenticated = asyncio.run(
+            services.authenticate_user("u", "1!SecurePass", session)
+        )
+
+    assert authenticated is user
+    assert user.hashed_password != outdated
+    assert not config.PWD_CONTEXT.needs_update(user.hashed_password)
+    session.commit.assert_called_once()
+
+
+def test_calibration_sets_the_cost_policy(monkeypatch):
+    context = CryptContext(
+        schemes=["bcrypt"], bcrypt__default_rounds=4, bcrypt__min_rounds=4
+    )
+    monkeypatch.setattr(config, "PWD_CONTEXT", context)
+    with patch("app.services.user_service._time_verify", return_value=1.0):
+        rounds = services.calibrate_password_hashing(target_ms=8)
+
+    assert rounds == 7
+    assert context.handler().default_rounds == 7
+    assert context.needs_update(bcrypt.using(rounds=4).hash("x"))
+    # Stronger hashes, e.g. from a worker that measured a higher cost, are kept
+    assert not context.needs_update(bcrypt.using(rounds=8).hash("x"))
+
+
+def test_calibration_never_lowers_the_configured_cost(monkeypatch):
+    context = CryptContext(
+        schemes=["bcrypt"], bcrypt__default_rounds=6, bcrypt__min_rounds=6
+    )
+    monkeypatch.setattr(config, "PWD_CONTEXT", context)
+    with patch("app.services.user_service._time_verify", return_value=100.0):
+        rounds = services.calibrate_password_hashing(target_ms=10)
+
+    assert rounds == 6
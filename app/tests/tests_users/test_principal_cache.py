@@ -0,0 +1,47 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app import schemas, services
+from app.exceptions import errors
+
+principal = schemas.Principal(
+    user_id=5, username="cached", role="user", disabled=False, verified=True
+)
+
+
+def token_for(username):
+    return services.create_access_token({"sub": username}, timedelta(minutes=5))
+
+
+def test_principal_loaded_once_per_user():
+    services.invalidate_principal("cached")
+    with patch(
+        "app.services.user_service._load_principal", return_value=principal
+    ) as load:
+        first = services.get_current_user(token_for("cached"), None)
+        second = services.get_current_user(token_for("cached"), None)
+
+    assert first == second == principal
+    assert load.call_count == 1
+
+
+def test_invalidated_principal_is_reloaded():
+    services.invalidate_principal("cached")
+    disabled = principal.model_copy(update={"disabled": True})
+    with patch(
+        "app.services.user_service._load_principal",
+        side_effect=[principal, disabled],
+    ):
+        services.get_current_user(token_for("cached"), None)
+        services.invalidate_principal("cached")
+        current = services.get_current_user(token_for("cached"), None)
+
+    with pytest.raises(errors.UserNotActive):
+        services.get_current_active_user(current)
+
+
+def test_invalid_token_is_rejected_before_the_cache():
+    with pytest.raises(errors.WrongCredentials):
+        services.get_current_user("not-a-token", None)
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import jwt
+
+from app import config, services
+from app.exceptions import errors
+from .test_conf import client
+
+
+def test_refresh_issues_a_new_token_pair():
+    user = SimpleNamespace(user_id=3, username="reader")
+    with patch(
+        "app.services.rotate_refresh_token", return_value=(user, "rotated")
+    ) as rotate:
+        response = client.post("/token/refresh", json={"refresh_token": "old"})
+
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] == "rotated"
+    payload = jwt.decode(
+        response.json()["access_token"],
+        config.SECRET_KEY,
+        algorithms=[config.ALGORITHM],
+    )
+    assert payload["sub"] == "reader"
+    assert rotate.call_args.args[0] == "old"
+
+
+def test_reused_refresh_token_is_rejected():
+    with patch(
+        "app.services.rotate_refresh_token",
+        side_effect=errors.InvalidRefreshToken(),
+    ):
+        response = client.post("/token/refresh", json={"refresh_token": "used"})
+
+    assert response.status_code == 401
+    assert response.json()["error_code"] == "invalid_refresh_token"
+
+
+def test_refresh_token_stored_as_hash():
+    session = MagicMock()
+
+    token = services.create_refresh_token(3, session)
+
+    stored = session.add.call_args.args[0]
+    assert stored.token_hash != token
+    assert len(stored.token_hash) == 64
+    assert stored.expires_at <= stored.session_expires_at
+
+
+def test_password_change_revokes_sessions():
+    user = SimpleNamespace(user_id=3, username="reader")
+    with patch("app.services.token_service.revoke_refresh_tokens") as revoke:
+        services.update_user(user, {"verified": True}, MagicMock())
+        revoke.assert_not_called()
+
+        services.update_user(user, {"hashed_password": "new"}, MagicMock())
+        revoke.assert_called_once()
+        assert revoke.call_args.args[0] == 3
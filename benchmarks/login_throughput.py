@@ -0,0 +1,102 @@
+"""Catalog latency while logins saturate the password hashing pool.
+
+Runs against a live server, first with catalog traffic only and then with a
+login storm on top, and prints the catalog latency percentiles and the
+login throughput of both phases:
+
+    RATE_LIMIT_LOGIN_PER_IP= RATE_LIMIT_LOGIN_PER_USERNAME= \\
+        uvicorn app.main:app --workers 1
+    python benchmarks/login_throughput.py --username admin --password '...'
+
+The storm logs in as one user from one address, so the login rate limits
+must be disabled (empty) for the run, or nearly every login is answered
+429 before it reaches the hashing pool. 429s are counted on their own and
+flagged in the report.
+
+With bcrypt on the event loop the catalog p99 climbs to several times the
+hash cost under the storm; with the hashing pool it stays close to the
+baseline, and surplus logins get 503 + Retry-After instead of queueing.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], fraction: float):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def catalog_reader(client: httpx.AsyncClient, stop: float, latencies: list):
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        await client.get("/books", params={"limit": 20})
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def login_storm(
+    client: httpx.AsyncClient, stop: float, credentials: dict, statuses: list
+):
+    while time.perf_counter() < stop:
+        response = await client.post("/token", data=credentials)
+        statuses.append(response.status_code)
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+
+async def run_phase(args, logins: int):
+    latencies, statuses = [], []
+    credentials = {"username": args.username, "password": args.password}
+    limits = httpx.Limits(max_connections=args.readers + logins)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60
+    ) as client:
+        stop = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(catalog_reader(client, stop, latencies) for _ in range(args.readers)),
+            *(login_storm(client, stop, credentials, statuses) for _ in range(logins)),
+        )
+    return latencies, statuses
+
+
+def report(name: str, latencies: list[float], statuses: list[int], duration: float):
+    print(
+        f"{name:>14}: catalog p50 {statistics.median(latencies):7.1f} ms"
+        f"  p99 {percentile(latencies, 0.99):7.1f} ms"
+        f"  ({len(latencies)} requests)"
+    )
+    if statuses:
+        accepted = sum(status == 200 for status in statuses)
+        busy = sum(status == 503 for status in statuses)
+        throttled = sum(status == 429 for status in statuses)
+        print(
+            f"{'':>14}  logins {accepted / duration:6.1f}/s accepted,"
+            f" {busy} answered 503, {throttled} answered 429"
+        )
+        if throttled:
+            print(
+                f"{'':>14}  warning: logins were rate limited, restart the server"
+                " with RATE_LIMIT_LOGIN_PER_IP= RATE_LIMIT_LOGIN_PER_USERNAME="
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args()
+
+    report("catalog only", *await run_phase(args, 0), args.duration)
+    report("+ login storm", *await run_phase(args, args.logins), args.duration)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())